@@ -2,6 +2,7 @@ import streamlit as st
 from prop.formula import *
 from prop.rules import *
 from prop.proofs import *
+from parse_cache import *
 
 st.title('Proofs for Propositional Logic')
 
@@ -10,7 +11,8 @@ st.markdown('')
 class TextBox():
     all_textboxes = []
 
-    def __init__(self, id, above_text_box, default_value, parsing_func, error_class, display_func, custom_error_message = None, placeholder = None):
+    # a parser that looks at the session, rather than at the input alone, is created with cached=False
+    def __init__(self, id, above_text_box, default_value, parsing_func, error_class, display_func, custom_error_message = None, placeholder = None, cached = True):
         self.id = id
         self.above_text_box = above_text_box
         self.default_value = default_value
@@ -19,6 +21,7 @@ class TextBox():
         self.display_func = display_func
         self.custom_error_message = custom_error_message
         self.placeholder = placeholder
+        self.cached = cached
 
         TextBox.all_textboxes.append(self)
     
@@ -30,10 +33,14 @@ class TextBox():
             st.session_state.textboxes[self.id]['value'] = self.default_value
             st.session_state.textboxes[self.id]['error'] = False
         if len(new_input) > 0:
-            try:
-                st.session_state.textboxes[self.id]['value'] = self.parsing_func(new_input)
+            if self.cached:
+                value, err = cached_parse(Parser('prop', self.parsing_func, self.error_class), new_input)
+            else:
+                value, err = parse_input(new_input, self.parsing_func, self.error_class)
+            if err is None:
+                st.session_state.textboxes[self.id]['value'] = value
                 st.session_state.textboxes[self.id]['error'] = False
-            except self.error_class as err:
+            else:
                 st.session_state.textboxes[self.id]['error'] = err
                 st.session_state.textboxes[self.id]['value'] = self.default_value
         
@@ -45,6 +52,9 @@ class TextBox():
         elif st.session_state.textboxes[self.id]['value'] != self.default_value:
             st.latex(self.display_func(st.session_state.textboxes[self.id]['value']))
 
+def assumptions_parser(string):
+    return list(map(PropNode.parse, string.split(',')))
+
 def assumptions_display(assumptions):
     assumptions_latex = ''
     for a in assumptions:
@@ -56,7 +66,7 @@ assumptions_textbox = TextBox(
     "assumptions_textbox",
     "Premises",
     [], 
-    lambda string: list(map(PropNode.parse, string.split(','))),
+    assumptions_parser,
     ParsingError,
     assumptions_display,
     custom_error_message="We can't parse the above formulas. Are you sure they're written in LaTeX and separated by commas?",
@@ -195,8 +205,17 @@ if st.session_state.textboxes['assumptions_textbox']['disabled']:
         st.session_state.main_proof = Proof(list(map(lambda x: AssumptionLine(x),st.session_state.textboxes['assumptions_textbox']['value'])))
         st.session_state.current_subproof = st.session_state.main_proof
 
+    # a long proof is quicker to typeset as a window around the current subproof, or as rows of small formulas, than as one LaTeX array
+    display = st.radio('Display', ('LaTeX', 'Window', 'HTML'), horizontal=True, key="display_prop")
+
     st.session_state.current_subproof.add_last(DeductionLine(Blank(), Blank()))
-    st.latex(st.session_state.main_proof.latex())
+    if display == 'LaTeX':
+        st.latex(st.session_state.main_proof.latex())
+    elif display == 'Window':
+        # only the lines around the current subproof, with the other subproofs collapsed
+        st.latex(st.session_state.main_proof.latex_window(st.session_state.current_subproof))
+    else:
+        st.markdown(st.session_state.main_proof.html(), unsafe_allow_html=True)
     st.session_state.current_subproof.remove_last()
 
     col1, col2 = st.columns([3,1])
@@ -206,9 +225,7 @@ if st.session_state.textboxes['assumptions_textbox']['disabled']:
         st.markdown('')
 
         def check_proof_button():
-            comments = []
-            for line_number in range(1, st.session_state.main_proof.n_lines() + 1):
-                comments.append(st.session_state.main_proof.check_line(line_number))
+            comments = st.session_state.main_proof.check_all()
             
             st.session_state.bad_comments = [(i+1, comment) for (i, comment) in enumerate(comments) if isinstance(comment, BadComment)]
 
@@ -2,6 +2,7 @@ import streamlit as st
 from pred.formula import *
 from pred.rules import *
 from pred.proofs import *
+from parse_cache import *
 
 st.title('Proofs for Predicate Logic')
 
@@ -10,7 +11,8 @@ st.markdown('')
 class TextBox():
     all_textboxes = []
 
-    def __init__(self, id, above_text_box, default_value, parsing_func, error_class, display_func, custom_error_message = None, placeholder = None):
+    # a parser that looks at the session, rather than at the input alone, is created with cached=False
+    def __init__(self, id, above_text_box, default_value, parsing_func, error_class, display_func, custom_error_message = None, placeholder = None, cached = True):
         self.id = id
         self.above_text_box = above_text_box
         self.default_value = default_value
@@ -19,6 +21,7 @@ class TextBox():
         self.display_func = display_func
         self.custom_error_message = custom_error_message
         self.placeholder = placeholder
+        self.cached = cached
 
         TextBox.all_textboxes.append(self)
     
@@ -30,10 +33,14 @@ class TextBox():
             st.session_state.textboxes[self.id]['value'] = self.default_value
             st.session_state.textboxes[self.id]['error'] = False
         if len(new_input) > 0:
-            try:
-                st.session_state.textboxes[self.id]['value'] = self.parsing_func(new_input)
+            if self.cached:
+                value, err = cached_parse(Parser('pred', self.parsing_func, self.error_class), new_input)
+            else:
+                value, err = parse_input(new_input, self.parsing_func, self.error_class)
+            if err is None:
+                st.session_state.textboxes[self.id]['value'] = value
                 st.session_state.textboxes[self.id]['error'] = False
-            except self.error_class as err:
+            else:
                 st.session_state.textboxes[self.id]['error'] = err
                 st.session_state.textboxes[self.id]['value'] = self.default_value
         
@@ -122,7 +129,7 @@ def new_const_parsing_func(string):
         raise ParsingError("We couldn't parse the above expression. Are you sure this is a constant name written in LaTeX?")
     if not form.ctgy == 'const':
         raise ParsingError('The above is interpreted as a variable or function-based expression, not a constant.')
-    if form.value in st.session_state.main_proof.consts():
+    if st.session_state.main_proof.has_const(form.value):
         raise ParsingError("This constant already appears in the proof.")
     return form
 
@@ -132,7 +139,8 @@ univ_intro_subproof_assumption_textbox = TextBox(
     None, 
     new_const_parsing_func, 
     ParsingError, 
-    lambda t: r"\boxed{" + t.latex() + r'}'
+    lambda t: r"\boxed{" + t.latex() + r'}',
+    cached=False
     )
 
 exist_elim_subproof_formula_textbox = TextBox(
@@ -150,7 +158,8 @@ exist_elim_subproof_constant_textbox = TextBox(
     None, 
     new_const_parsing_func, 
     ParsingError, 
-    lambda t: r"\boxed{" + t.latex() + r'}'
+    lambda t: r"\boxed{" + t.latex() + r'}',
+    cached=False
     )
 
 pred_add_line_textbox1 = TextBox(
@@ -248,8 +257,17 @@ if st.session_state.textboxes['pred_assumptions_textbox']['disabled']:
         st.session_state.main_proof = Proof(list(map(lambda x: NormalAssumptionLine(x),st.session_state.textboxes['pred_assumptions_textbox']['value'])))
         st.session_state.current_subproof = st.session_state.main_proof
 
+    # a long proof is quicker to typeset as a window around the current subproof, or as rows of small formulas, than as one LaTeX array
+    display = st.radio('Display', ('LaTeX', 'Window', 'HTML'), horizontal=True, key="pred_display_prop")
+
     st.session_state.current_subproof.add_last(DeductionLine(Blank(), Blank()))
-    st.latex(st.session_state.main_proof.latex())
+    if display == 'LaTeX':
+        st.latex(st.session_state.main_proof.latex())
+    elif display == 'Window':
+        # only the lines around the current subproof, with the other subproofs collapsed
+        st.latex(st.session_state.main_proof.latex_window(st.session_state.current_subproof))
+    else:
+        st.markdown(st.session_state.main_proof.html(), unsafe_allow_html=True)
     st.session_state.current_subproof.remove_last()
 
     col1, col2 = st.columns([3,1])
@@ -259,13 +277,11 @@ if st.session_state.textboxes['pred_assumptions_textbox']['disabled']:
         st.markdown('')
 
         def check_proof_button():
-            comments = []
-            for line_number in range(1, st.session_state.main_proof.n_lines() + 1):
-                comments.append(st.session_state.main_proof.check_line(line_number))
+            comments = st.session_state.main_proof.check_all()
             
-            st.session_state.bad_comments = [(i+1, comment) for (i, comment) in enumerate(comments) if isinstance(comment, BadComment)]
+            st.session_state.bad_comments = [(i+1, comment, st.session_state.main_proof.identity_hint(i+1)) for (i, comment) in enumerate(comments) if isinstance(comment, BadComment)]
 
-            st.session_state.reached_conclusion = st.session_state.current_subproof == st.session_state.main_proof and len(st.session_state.main_proof.subproofs) > 0 and isinstance(st.session_state.main_proof.subproofs[-1], DeductionLine) and st.session_state.main_proof.find(st.session_state.main_proof.n_lines()).formula.eq_syntax(st.session_state.textboxes["pred_conclusion_textbox"]["value"])
+            st.session_state.reached_conclusion = st.session_state.current_subproof == st.session_state.main_proof and len(st.session_state.main_proof.subproofs) > 0 and isinstance(st.session_state.main_proof.subproofs[-1], DeductionLine) and st.session_state.main_proof.find(st.session_state.main_proof.n_lines()).formula.alpha_eq(st.session_state.textboxes["pred_conclusion_textbox"]["value"])
             
         st.button('Check Proof', on_click=check_proof_button)
 
@@ -278,8 +294,10 @@ if st.session_state.textboxes['pred_assumptions_textbox']['disabled']:
             st.markdown("Unfortunately, this proof is not correct. Here are some specific errors.")
             col1, col2 = st.columns([1, 10])
             with col2:
-                for (line_number, comment) in st.session_state.bad_comments:
+                for (line_number, comment, hint) in st.session_state.bad_comments:
                     st.markdown(f"Line {line_number}: {comment.text.lower()}")
+                    if hint is not None:
+                        st.markdown(f"*Hint:* {hint}")
 
     ###################
     # CREATE NEW LINE #
@@ -0,0 +1,48 @@
+import functools
+from rulebook import RuleBook
+
+# Parsed textbox inputs are shared by all sessions of the server, so a textbox that didn't change
+# (or premises that every student types) is parsed once per process.
+# Entries are keyed by the page, the module and qualified name of the parser, the errors it reports and the input:
+# a page defines its own parsers anew on every rerun, and both pages have a Rule.parse of their own.
+# Rules parse differently once a rule set is switched or a rule is defined, so the key also has the version of the rules.
+# An error is kept as its class and message, not as the exception, which would hold on to the frames of its traceback.
+
+def parse_input(string, parsing_func, error_class):
+    try:
+        return parsing_func(string), None
+    except error_class as err:
+        return None, err
+
+class Parser():
+    def __init__(self, page, parsing_func, error_class):
+        self.page = page
+        self.parsing_func = parsing_func
+        self.error_class = error_class
+        self.key = (page, parsing_func.__module__, parsing_func.__qualname__, error_class, RuleBook.version)
+
+    def __eq__(self, other):
+        return isinstance(other, Parser) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f'Parser{self.key}'
+
+@functools.lru_cache(maxsize=2048)
+def parse_entry(parser, string):
+    value, err = parse_input(string, parser.parsing_func, parser.error_class)
+    if err is None:
+        return value, None
+    return None, (type(err), err.args)
+
+def cached_parse(parser, string):
+    """
+    Returns the parsed input and None, or None and the error raised by the parser
+    """
+    value, err = parse_entry(parser, string)
+    if err is None:
+        return value, None
+    err_class, args = err
+    return None, err_class(*args)
@@ -0,0 +1,403 @@
+from pred.lines import *
+from pred.comments import *
+from pred.schemas import *
+
+class CheckerError(LogicError):
+    pass
+
+class Checker():
+    """
+    The logic of one deduction rule. Calling a checker on the deduced formula, the cited formulas
+    and the cited subproofs returns a GoodComment or a BadComment.
+    A rule with a schema accepts whatever the schema matches; check, if any, explains the rest.
+    """
+    def __init__(self, name, check, schema=None):
+        self.name = name
+        self.check = check
+        self.schema = schema
+
+    def __call__(self, main_formula, cit_formulas, cit_subproofs):
+        if self.schema is not None and self.schema.match(main_formula, cit_formulas, cit_subproofs):
+            return GoodComment()
+        if self.check is None:
+            return BadComment(f'The cited lines and the deduced formula do not fit the rule {self.name}.')
+        return self.check(main_formula, cit_formulas, cit_subproofs)
+
+    def __repr__(self):
+        return f'Checker({self.name})'
+
+# formulas are hash-consed, so these are the very nodes the parser builds
+BOT = Pred_Form('conn', r'\bot', [])
+
+# the rules compare formulas up to the names of their bound variables, so \forall x P(x) and \forall y P(y) are the same formula
+def negates(formula1, formula2):
+    return formula1.name == r'\neg' and formula1.sub[0].alpha_eq(formula2)
+
+def contradictory(formula):
+    """
+    Checks that formula is the conjunction of a formula and its negation
+    """
+    return formula.name == r'\wedge' and (negates(formula.sub[0], formula.sub[1]) or negates(formula.sub[1], formula.sub[0]))
+
+def reiteration(main_formula, cit_formulas, cit_subproofs):
+    if main_formula.alpha_eq(cit_formulas[0]):
+        return GoodComment()
+    else:
+        return BadComment('The reiterated formula is different than the cited formula.')
+
+def and_elim(main_formula, cit_formulas, cit_subproofs):
+    cit_formula = cit_formulas[0]
+    if not cit_formula.name == r'\wedge':
+        return BadComment('The cited formula is not a conjunction.')
+
+    if not (main_formula.alpha_eq(cit_formula.sub[0]) or main_formula.alpha_eq(cit_formula.sub[1])):
+        return BadComment('The deduced formula is different than both conjuncts of the cited formula.')
+
+    return GoodComment()
+
+def and_intro(main_formula, cit_formulas, cit_subproofs):
+    if not main_formula.name == r'\wedge':
+        return BadComment('The deduced formula is not a conjunction.')
+
+    left, right = main_formula.sub
+    if not ((left.alpha_eq(cit_formulas[0]) and right.alpha_eq(cit_formulas[1])) or (left.alpha_eq(cit_formulas[1]) and right.alpha_eq(cit_formulas[0]))):
+        return BadComment('The deduced formula is not the conjunction of the two cited formulas.')
+
+    return GoodComment()
+
+def to_elim(main_formula, cit_formulas, cit_subproofs):
+    impl_formulas = []
+    for cit_formula in cit_formulas:
+        if cit_formula.name == r'\to':
+            impl_formulas.append(cit_formula)
+
+    if len(impl_formulas)==0:
+        return BadComment('Neither cited formula is an implication.')
+
+    final_impl_formula = None
+
+    for impl_formula in impl_formulas:
+        ant_formula = cit_formulas[1] if impl_formula is cit_formulas[0] else cit_formulas[0]
+        if impl_formula.sub[0].alpha_eq(ant_formula):
+            final_impl_formula = impl_formula
+
+    if final_impl_formula is None:
+        return BadComment('Neither cited formula is the antecedent of the other.')
+
+    if final_impl_formula.sub[1].alpha_eq(main_formula):
+        return GoodComment()
+    else:
+        return BadComment('The deduced formula is not the consequent of the relevant cited formula.')
+
+def to_intro(main_formula, cit_formulas, cit_subproofs):
+    if not main_formula.name == r'\to':
+        return BadComment('The deduced formula is not an implication.')
+    elif not main_formula.sub[0].alpha_eq(cit_subproofs[0].first().formula):
+        return BadComment("The antecedent of the deduced formula is not the assumption of the cited subproof.")
+    elif not main_formula.sub[1].alpha_eq(cit_subproofs[0].last().formula):
+        return BadComment("The consequent of the deduced formula is not the last line of the cited subproof.")
+    else:
+        return GoodComment()
+
+def iff_intro(main_formula, cit_formulas, cit_subproofs):
+    if not main_formula.name == r'\leftrightarrow':
+        return BadComment('The deduced formula is not a biconditional.')
+    elif not (cit_subproofs[0].last().formula.alpha_eq(cit_subproofs[1].first().formula)):
+        return BadComment('The second subproof does not begin with the last line of the first subproof.')
+    elif not (cit_subproofs[1].last().formula.alpha_eq(cit_subproofs[0].first().formula)):
+        return BadComment('The second subproof does not end with the first line of the first subproof.')
+    elif not ((cit_subproofs[0].first().formula.alpha_eq(main_formula.sub[0]) and cit_subproofs[0].last().formula.alpha_eq(main_formula.sub[1])) or (cit_subproofs[0].first().formula.alpha_eq(main_formula.sub[1]) and cit_subproofs[0].last().formula.alpha_eq(main_formula.sub[0]))):
+        return BadComment('The subproofs do not begin and end with the conditionals of the deduced line.')
+    else:
+        return GoodComment()
+
+def iff_elim(main_formula, cit_formulas, cit_subproofs):
+    bicond_formulas = []
+    for cit_formula in cit_formulas:
+        if cit_formula.name == r'\leftrightarrow':
+            bicond_formulas.append(cit_formula)
+
+    if len(bicond_formulas) == 0:
+        return BadComment('Neither cited formula is a biconditional.')
+
+    final_bicond_formula = None
+    final_other_formula = None
+    for bicond_formula in bicond_formulas:
+        other_formula = cit_formulas[1] if bicond_formula is cit_formulas[0] else cit_formulas[0]
+        if bicond_formula.sub[0].alpha_eq(other_formula) or bicond_formula.sub[1].alpha_eq(other_formula):
+            final_bicond_formula = bicond_formula
+            final_other_formula = other_formula
+
+    if final_bicond_formula is None:
+        return BadComment('The cited biconditional does not have the other cited formula as either of its conditionals.')
+
+    if not ((final_bicond_formula.sub[0].alpha_eq(final_other_formula) and final_bicond_formula.sub[1].alpha_eq(main_formula))or(final_bicond_formula.sub[1].alpha_eq(final_other_formula) and final_bicond_formula.sub[0].alpha_eq(main_formula))):
+        return BadComment('The cited biconditional does not have as one conditional the cited line and as the other conditional the deduced line.')
+
+    return GoodComment()
+
+def neg_elim(main_formula, cit_formulas, cit_subproofs):
+    cit_formula = cit_formulas[0]
+    if not cit_formula.name == r'\neg':
+        return BadComment('The cited formula is not a negation.')
+
+    if not main_formula.name == r'\to':
+        return BadComment('The deduced formula is not an implication.')
+
+    if not (main_formula.sub[0].alpha_eq(cit_formula.sub[0])):
+        return BadComment('The unnegated version of the cited formula is not the antecedent of the deduced formula.')
+
+    return GoodComment()
+
+def efq(main_formula, cit_formulas, cit_subproofs):
+    if not contradictory(cit_formulas[0]):
+        return BadComment('The cited formula is not the conjunction of a formula and its negation.')
+
+    return GoodComment()
+
+def bot_elim(main_formula, cit_formulas, cit_subproofs):
+    if not (cit_formulas[0].name == r'\bot'):
+        return BadComment('The cited formula is not bottom.')
+
+    return GoodComment()
+
+def bot_intro(main_formula, cit_formulas, cit_subproofs):
+    if not (main_formula.name == r'\bot'):
+        return BadComment('The deduced formula is not bottom.')
+
+    if not (negates(cit_formulas[0], cit_formulas[1]) or negates(cit_formulas[1], cit_formulas[0])):
+        return BadComment('Neither cited formula is the negation of the other.')
+
+    return GoodComment()
+
+def neg_intro(main_formula, cit_formulas, cit_subproofs):
+    cit_subproof = cit_subproofs[0]
+
+    if not negates(main_formula, cit_subproof.first().formula):
+        return BadComment("The deduced formula is not the negation of cited subproof's assumption.")
+
+    if not (cit_subproof.last().formula.alpha_eq(BOT) or contradictory(cit_subproof.last().formula)):
+        return BadComment('The last formula of the cited subproof is not bottom or the conjunction of a formula and its negation.')
+
+    return GoodComment()
+
+def raa(main_formula, cit_formulas, cit_subproofs):
+    cit_subproof = cit_subproofs[0]
+
+    if not negates(cit_subproof.first().formula, main_formula):
+        return BadComment("The cited subproof's assumption is not the negation of deduced formula.")
+
+    if not (cit_subproof.last().formula.alpha_eq(BOT) or contradictory(cit_subproof.last().formula)):
+        return BadComment('The last formula of the cited subproof is not bottom or the conjunction of a formula and its negation.')
+
+    return GoodComment()
+
+def or_intro(main_formula, cit_formulas, cit_subproofs):
+    cit_formula = cit_formulas[0]
+
+    if not (main_formula.name == r'\vee'):
+        return BadComment('The deduced formula is not a disjunction.')
+
+    if main_formula.sub[0].alpha_eq(cit_formula) or main_formula.sub[1].alpha_eq(cit_formula):
+        return GoodComment()
+    else:
+        return BadComment('The cited formula is different than both disjuncts of the deduced formula.')
+
+def or_elim(main_formula, cit_formulas, cit_subproofs):
+    cit_formula = cit_formulas[0]
+
+    if not (cit_formula.name == r'\vee'):
+        return BadComment('The cited formula is not a disjunction.')
+
+    if not ((cit_formula.sub[0].alpha_eq(cit_subproofs[0].first().formula) and cit_formula.sub[1].alpha_eq(cit_subproofs[1].first().formula)) or (cit_formula.sub[0].alpha_eq(cit_subproofs[1].first().formula) and cit_formula.sub[1].alpha_eq(cit_subproofs[0].first().formula))):
+        return BadComment('The assumptions of the two cited subproofs are not the same as the disjuncts of the cited disjunction.')
+
+    if not (cit_subproofs[0].last().formula.alpha_eq(cit_subproofs[1].last().formula)):
+        return BadComment('The last line of the two cited subproofs are not the same.')
+
+    if not (cit_subproofs[0].last().formula.alpha_eq(main_formula)):
+        return BadComment('The deduced formula is not the same as the last line of the two cited subproofs.')
+
+    return GoodComment()
+
+def eq_intro(main_formula, cit_formulas, cit_subproofs):
+    if not main_formula.name == '=':
+        return BadComment('The deduced formula is not an identity statement.')
+    if not main_formula.sub[0].eq_syntax(main_formula.sub[1]):
+        return BadComment('The left and right term of the deduced identity are not the same.')
+
+    return GoodComment()
+
+def eq_elim(main_formula, cit_formulas, cit_subproofs):
+    phi_prime = main_formula
+
+    possible_eq = []
+    for f in cit_formulas:
+        if f.name == '=':
+            possible_eq.append(f)
+
+    if len(possible_eq) == 0:
+        return BadComment('Neither cited formula is an identity.')
+
+    number_to_text = {
+        1: 'not all variables in the substituted term are free in the cited formula.',
+        2: 'the relevant term is not substitutable in the cited formula.',
+        3: 'the deduced formula is not the result of replacing any number of instances of the first term with instances of the second term.'
+    }
+
+    comment_number = 0
+
+    for eq in possible_eq:
+        phi = cit_formulas[1] if eq is cit_formulas[0] else cit_formulas[0]
+        for (t1, t2) in [(eq.sub[0], eq.sub[1]), (eq.sub[1], eq.sub[0])]:
+
+            if not t1.free().issubset(phi.free()):
+                comment_number = max(comment_number, 1)
+                continue
+
+            able_to_substitute = True
+            for var_name in t1.free():
+                able_to_substitute = able_to_substitute and substitutable(phi, var_name, t2.free())
+            if not able_to_substitute:
+                comment_number = max(comment_number, 2)
+                continue
+
+            if not substitute_compare_TT(phi, phi_prime, t1, t2):
+                comment_number = max(comment_number, 3)
+                continue
+
+            comment_number = 4
+
+    if comment_number == 0:
+        raise CheckerError('problem not captured by =E checker')
+    elif comment_number < 4:
+        return BadComment(number_to_text[comment_number])
+    else:
+        return GoodComment()
+
+def forall_elim(main_formula, cit_formulas, cit_subproofs):
+    cit_formula = cit_formulas[0]
+
+    if not (cit_formula.ctgy == 'quant' and cit_formula.quantifier == r'\forall'):
+        return BadComment('the cited formula is not a universal quantification.')
+
+    var_name = cit_formula.var
+
+    if not (substitute_compare_total(cit_formula.sub[0], main_formula, var_name)):
+        return BadComment(f'the deduced formula is not the result of substituting a term for {var_name} in the cited formula.')
+
+    return GoodComment()
+
+def exists_intro(main_formula, cit_formulas, cit_subproofs):
+    cit_formula = cit_formulas[0]
+
+    if not (main_formula.ctgy == 'quant' and main_formula.quantifier == r'\exists'):
+        return BadComment('the deduced formula is not an existential quantification.')
+
+    var_name = main_formula.var
+
+    if not (substitute_compare_total(main_formula.sub[0], cit_formula, var_name)):
+        return BadComment(f'the cited formula is not the result of substituting a term for {var_name} in the deduced formula.')
+
+    return GoodComment()
+
+def forall_intro(main_formula, cit_formulas, cit_subproofs):
+    cit_subproof = cit_subproofs[0]
+
+    if not isinstance(cit_subproof.first(), UnivIntroAssumptionLine):
+        return BadComment('The cited subproof does not begin with a boxed constant.')
+    const_name = cit_subproof.first().const_name
+
+    if cit_subproof.has_const_outside(const_name):
+        return BadComment('The cited subproof begins with a constant that appears elsewhere in the proof.')
+
+    if not (main_formula.ctgy == 'quant' and main_formula.quantifier == r'\forall'):
+        return BadComment('The deduced formula is not a universal quantification.')
+    var_name = main_formula.var
+    phi = main_formula.sub[0]
+
+    if not (cit_subproof.last().formula.alpha_eq(substitute_form(phi, var_name, Pred_Term('const', const_name, None)))):
+        return BadComment('The last formula of the cited subproof is not the same as the deduced formula with the relevant substitution.')
+
+    return GoodComment()
+
+def exists_elim(main_formula, cit_formulas, cit_subproofs):
+    cit_formula = cit_formulas[0]
+    cit_subproof = cit_subproofs[0]
+
+    if not (cit_formula.ctgy == 'quant' and cit_formula.quantifier == r'\exists'):
+        return BadComment('the cited formula is not an existential quantification.')
+
+    var_name = cit_formula.var
+    phi = cit_formula.sub[0]
+
+    if not isinstance(cit_subproof.first(), ExistElimAssumptionLine):
+        return BadComment('the cited subproof does not begin with a formula and a boxed constant.')
+
+    phi_subbed = cit_subproof.first().formula
+    const_name = cit_subproof.first().const_name
+
+    if const_name in cit_subproof.last().formula.consts():
+        return BadComment('the cited subproof ends with a formula, which contains the new constant.')
+
+    if not (substitute_form(phi, var_name, Pred_Term('const', const_name, None)).alpha_eq(phi_subbed)):
+        return BadComment('the cited subproof does not begin with the cited existential with the existentially quantified variable substituted for the relevant constant.')
+
+    if not (main_formula.alpha_eq(cit_subproof.last().formula)):
+        return BadComment('the cited subproof does not end with the deduced formula.')
+
+    return GoodComment()
+
+# one checker per entry of rules; a course-specific rule needs an entry in both
+checkers = {name: Checker(name, check) for (name, check) in [
+    (r'\wedge E', and_elim),
+    (r'\wedge I', and_intro),
+    (r'\vee E', or_elim),
+    (r'\vee I', or_intro),
+    (r'\to E', to_elim),
+    (r'\to I', to_intro),
+    (r'\neg E', neg_elim),
+    (r'\neg I', neg_intro),
+    (r'\leftrightarrow E', iff_elim),
+    (r'\leftrightarrow I', iff_intro),
+    (r'\bot E', bot_elim),
+    (r'\bot I', bot_intro),
+    (r'RAA', raa),
+    (r'EFQ', efq),
+    (r'R', reiteration),
+    (r'= I', eq_intro),
+    (r'= E', eq_elim),
+    (r'\forall I', forall_intro),
+    (r'\forall E', forall_elim),
+    (r'\exists I', exists_intro),
+    (r'\exists E', exists_elim),
+]}
+
+for (name, text) in schemas.items():
+    checkers[name].schema = Schema(text)
+
+builtin_checkers = dict(checkers)
+checker_tables = {name: ruleset.table(builtin_checkers, lambda rule_name, schema: Checker(rule_name, None, schema)) for (name, ruleset) in rulesets.items()}
+
+def use_ruleset(name):
+    """
+    Switches to the rule set name, using the tables built at import.
+    The rules and checkers dicts are global, so this changes the rules of every session of the process:
+    it is meant for startup, where the rule set named by the environment is installed.
+    """
+    if name not in rulesets:
+        raise RulesetError(f'there is no rule set {name}')
+    use_rules(name)
+    checkers.clear()
+    checkers.update(checker_tables[name])
+
+use_ruleset(ruleset_name)
+
+def define_rule(name, text):
+    """
+    Adds a rule given by a schema, e.g. define_rule('MT', derived_schemas['MT']), for every session like use_ruleset
+    """
+    schema = Schema(text)
+    rules[name] = schema.citations
+    compile_rules()
+    checkers[name] = Checker(name, None, schema)
@@ -0,0 +1,114 @@
+from pred.formula import *
+
+class CongruenceError(LogicError):
+    pass
+
+class Congruence():
+    """
+    The equalities between terms that follow from some identities by reflexivity, symmetry,
+    transitivity and congruence (f(s) = f(t) whenever s = t), kept in a union-find structure.
+    Terms are hash-consed, so they are used directly as the nodes.
+    """
+    def __init__(self, identities=()):
+        self.parent = {}
+        self.size = {}
+        # the function terms with an argument in each class, by the representative of the class
+        self.uses = {}
+        # function terms by their value and the representatives of their arguments
+        self.signatures = {}
+        for identity in identities:
+            self.add(identity)
+
+    def add(self, identity):
+        if identity.ctgy != 'identity':
+            raise CongruenceError('only identities can be added to a congruence')
+        self.merge(identity.sub[0], identity.sub[1])
+
+    def add_term(self, term):
+        if term in self.parent:
+            return
+        self.parent[term] = term
+        self.size[term] = 1
+        self.uses[term] = []
+        if term.ctgy == 'func':
+            for arg in term.sub:
+                self.add_term(arg)
+                self.uses[self.find(arg)].append(term)
+            signature = self.signature(term)
+            if signature in self.signatures:
+                self.merge(term, self.signatures[signature])
+            else:
+                self.signatures[signature] = term
+
+    def signature(self, term):
+        return (term.value, tuple(self.find(arg) for arg in term.sub))
+
+    def find(self, term):
+        root = term
+        while self.parent[root] is not root:
+            root = self.parent[root]
+        while self.parent[term] is not root:
+            self.parent[term], term = root, self.parent[term]
+        return root
+
+    def merge(self, term1, term2):
+        self.add_term(term1)
+        self.add_term(term2)
+        pending = [(term1, term2)]
+        while len(pending) > 0:
+            (term1, term2) = pending.pop()
+            root1, root2 = self.find(term1), self.find(term2)
+            if root1 is root2:
+                continue
+            if self.size[root1] > self.size[root2]:
+                root1, root2 = root2, root1
+            self.parent[root1] = root2
+            self.size[root2] += self.size[root1]
+
+            # the terms using the smaller class get new signatures, which may meet an equal one
+            for term in self.uses.pop(root1):
+                signature = self.signature(term)
+                other = self.signatures.get(signature)
+                if other is None:
+                    self.signatures[signature] = term
+                elif self.find(other) is not self.find(term):
+                    pending.append((term, other))
+                self.uses[root2].append(term)
+
+    def equal(self, x, y):
+        """
+        Checks that the terms x and y are equal, or that the atomic formulas x and y say the same
+        of equal terms, given the identities of the congruence
+        """
+        if isinstance(x, Pred_Term) and isinstance(y, Pred_Term):
+            self.add_term(x)
+            self.add_term(y)
+            return self.find(x) is self.find(y)
+        if not (isinstance(x, Pred_Form) and isinstance(y, Pred_Form)):
+            raise CongruenceError('can only compare two terms or two atomic formulas')
+        if x.ctgy not in ['identity', 'pred'] or y.ctgy not in ['identity', 'pred']:
+            raise CongruenceError('can only compare two terms or two atomic formulas')
+        if x.ctgy == 'identity' and y.ctgy == 'identity':
+            return (self.equal(x.sub[0], y.sub[0]) and self.equal(x.sub[1], y.sub[1])) or (self.equal(x.sub[0], y.sub[1]) and self.equal(x.sub[1], y.sub[0]))
+        if x.ctgy != y.ctgy or x.value != y.value or len(x.sub) != len(y.sub):
+            return False
+        for (x_arg, y_arg) in zip(x.sub, y.sub):
+            if not self.equal(x_arg, y_arg):
+                return False
+        return True
+
+    def holds(self, identity):
+        """
+        Checks that the identity follows from the identities of the congruence
+        """
+        if identity.ctgy != 'identity':
+            raise CongruenceError('only identities can hold in a congruence')
+        return self.equal(identity.sub[0], identity.sub[1])
+
+    def equals(self, term):
+        """
+        The terms seen so far that are equal to term
+        """
+        self.add_term(term)
+        root = self.find(term)
+        return frozenset(other for other in self.parent if self.find(other) is root)
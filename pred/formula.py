@@ -1,9 +1,22 @@
 from pred.symbols import *
-import random
+import functools
+import threading
+import weakref
 
 class ParsingError(LogicError):
     note = "We couldn't parse the above formula. Are you sure it's written in LaTeX?"
-    pass
+
+    def __init__(self, message, position=None):
+        super().__init__(message)
+        self.position = position
+
+    @classmethod
+    def at(cls, string, position):
+        if position >= len(string.rstrip()):
+            hint = 'The formula seems to end too early.'
+        else:
+            hint = f'The problem seems to be at character {position+1}.'
+        return cls(f'{ParsingError.note} {hint}', position)
 
 class TermError(ParsingError):
     pass
@@ -11,284 +24,401 @@ class TermError(ParsingError):
 class FormulaError(ParsingError):
     pass
 
+aliases = {
+    r'\rightarrow': r'\to',
+    r'\all': r'\forall',
+    r'\land': r'\wedge',
+    r'\lor': r'\vee',
+}
+
+spellings = {conn: conn for conn in zeroary + unary + binary + quants}
+spellings.update(aliases)
+spellings = dict(sorted(spellings.items(), key=lambda item: -len(item[0])))
+
+precedence = {conn: i for (i, conn) in enumerate(binary)}
+
+def alpha_key(tree, binders, depth):
+    """
+    binders maps the variables bound around tree to the depth of their quantifier
+    """
+    closed = binders.keys().isdisjoint(tree.free())
+    if isinstance(tree, Pred_Term):
+        if closed:
+            return tree
+        if tree.ctgy == 'var':
+            return depth - binders[tree.value]
+        return (tree.value, tuple(alpha_key(sub, binders, depth) for sub in tree.sub))
+
+    # the key of a formula that uses no variable bound around it doesn't depend on binders
+    if closed and tree._alpha is not None:
+        return tree._alpha
+    if tree.ctgy == 'quant':
+        outer = binders.get(tree.var)
+        binders[tree.var] = depth
+        key = (tree.quantifier, alpha_key(tree.sub[0], binders, depth+1))
+        if outer is None:
+            del binders[tree.var]
+        else:
+            binders[tree.var] = outer
+    else:
+        key = (tree.ctgy, tree.value, tuple(alpha_key(sub, binders, depth) for sub in tree.sub))
+    if closed:
+        object.__setattr__(tree, '_alpha', key)
+    return key
+
+def tokenize(string):
+    """
+    Splits a predicate-logic formula into (kind, value, position) tokens in one pass.
+    Every symbol other than a LaTeX command, a constant or punctuation is a single character.
+    Spaces are dropped before anything else, as the parser always did, so "\for all x" reads as "\forall x".
+    """
+    # kept[i] is where the i-th remaining character was in string, for the error messages
+    kept = [i for (i, char) in enumerate(string) if not char.isspace()]
+    text = ''.join(string[i] for i in kept)
+    kept.append(len(string))
+    tokens = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char in '(),=':
+            tokens.append((char, char, kept[i]))
+            i += 1
+        elif char == '\\':
+            for spelling, conn in spellings.items():
+                if text.startswith(spelling, i):
+                    break
+            else:
+                raise FormulaError.at(string, kept[i])
+            if conn in zeroary:
+                tokens.append(('atom', conn, kept[i]))
+            elif conn in unary:
+                tokens.append(('unary', conn, kept[i]))
+            elif conn in quants:
+                tokens.append(('quant', conn, kept[i]))
+            else:
+                tokens.append(('binary', conn, kept[i]))
+            i += len(spelling)
+        elif char == 'c':
+            if text.startswith('_', i+1):
+                end = i+2
+                while end < len(text) and text[end].isdigit():
+                    end += 1
+                if end == i+2:
+                    raise TermError.at(string, kept[i])
+                tokens.append(('const', 'c_{' + text[i+2:end] + '}', kept[i]))
+                i = end
+            else:
+                tokens.append(('const', 'c', kept[i]))
+                i += 1
+        elif char in '_{}':
+            raise FormulaError.at(string, kept[i])
+        else:
+            tokens.append(('symbol', char, kept[i]))
+            i += 1
+    tokens.append(('end', None, len(string)))
+    return tokens
+
+def parse_term(string, tokens, i):
+    """
+    Parses the term starting at tokens[i] and returns it with the index of the next token.
+    """
+    kind, value, position = tokens[i]
+    if kind == 'const':
+        return Pred_Term('const', value, None), i+1
+    if kind != 'symbol':
+        raise TermError.at(string, position)
+    if tokens[i+1][0] != '(':
+        return Pred_Term('var', value, None), i+1
+    args = []
+    i += 2
+    while True:
+        arg, i = parse_term(string, tokens, i)
+        args.append(arg)
+        if tokens[i][0] == ')':
+            return Pred_Term('func', value, args), i+1
+        if tokens[i][0] != ',':
+            raise TermError.at(string, tokens[i][2])
+        i += 1
+
 class Pred_Term:
-    def __init__(self, ctgy, value, sub):
-        self.ctgy = ctgy
-        self.value = value
-        self.sub = sub
+    """
+    Terms are hash-consed like formulas: equal terms are the same object,
+    so eq_syntax is an identity check and the cached hash is a structural fingerprint.
+    """
+    __slots__ = ('ctgy', 'value', 'sub', '_hash', '_free', '_consts', '_latex', '__weakref__')
+    _interned = weakref.WeakValueDictionary()
+    _intern_lock = threading.Lock()
+    def __new__(cls, ctgy, value, sub):
+        if sub is not None:
+            sub = tuple(sub)
+        key = (ctgy, value, sub)
+        with cls._intern_lock:
+            term = cls._interned.get(key)
+            if term is None:
+                term = object.__new__(cls)
+                object.__setattr__(term, 'ctgy', ctgy)
+                object.__setattr__(term, 'value', value)
+                object.__setattr__(term, 'sub', sub)
+                object.__setattr__(term, '_hash', hash(key))
+                object.__setattr__(term, '_free', None)
+                object.__setattr__(term, '_consts', None)
+                object.__setattr__(term, '_latex', None)
+                cls._interned[key] = term
+        return term
+    def __setattr__(self, attr, value):
+        raise LogicError('trying to modify a Pred_Term, which is immutable')
+    def __hash__(self):
+        return self._hash
+    def __reduce__(self):
+        return (Pred_Term, (self.ctgy, self.value, self.sub))
     def __repr__(self):
-        return f'Pred_Term({self.ctgy}, {self.value}, {self.sub})'
+        return f'Pred_Term({self.ctgy}, {self.value}, {None if self.sub is None else list(self.sub)})'
     def latex(self):
-        if self.ctgy == 'func':
-            output = f'{self.value}('
-            for sub in self.sub:
-                output += sub.latex() + ','
-            output = output[:-1] + ')'
-            return output
-        else:
-            return self.value
+        if self._latex is None:
+            if self.ctgy == 'func':
+                output = f'{self.value}(' + ','.join(sub.latex() for sub in self.sub) + ')'
+            else:
+                output = self.value
+            object.__setattr__(self, '_latex', output)
+        return self._latex
     def free(self):
-        if self.ctgy == 'const':
-            return set([])
-        elif self.ctgy == 'var':
-            return {self.value}
-        elif self.ctgy == 'func':
-            output = set([])
-            for sub in self.sub:
-                output = output | sub.free()
-            return output
+        if self._free is None:
+            if self.ctgy == 'const':
+                output = frozenset()
+            elif self.ctgy == 'var':
+                output = frozenset([self.value])
+            elif self.ctgy == 'func':
+                output = frozenset().union(*[sub.free() for sub in self.sub])
+            object.__setattr__(self, '_free', output)
+        return self._free
     def eq_syntax(self, other):
         if not isinstance(other, Pred_Term):
             return False
-        return self.latex() == other.latex()
+        return self is other
     def parse(string):
-        string = string.replace(' ', '')
-        if len(string) == 0:
-            raise TermError(ParsingError.note)
-        if string[0] == 'c':
-            if len(string) == 1:
-                return Pred_Term('const', string, None)
-            if string[1] == '_':
-                try:
-                    int(string[2:])
-                    return Pred_Term('const', string[:2] + r'{' + string[2:] + r'}', None)
-                except ValueError:
-                    raise TermError(ParsingError.note)
-            raise TermError(ParsingError.note)
-        elif len(string) == 1:
-            return Pred_Term('var', string, None)
-        elif string[1] == '(' and string[-1] == ')':
-            try:
-                return Pred_Term('func', string[0], list(map(Pred_Term.parse, string[2:-1].split(','))))
-            except TermError:
-                return Pred_Term('func', string[0], [Pred_Term.parse(string[2:-1])])
-        raise TermError(ParsingError.note)
+        tokens = tokenize(string)
+        term, i = parse_term(string, tokens, 0)
+        if tokens[i][0] != 'end':
+            raise TermError.at(string, tokens[i][2])
+        return term
     def consts(self):
-        if self.ctgy == 'const':
-            return [self.value]
-        elif self.ctgy == 'var':
-            return []
-        elif self.ctgy == 'func':
-            output = []
-            for sub in self.sub:
-                output += sub.consts()
-            return output
-
-def indices(string, sub):
-	if sub not in string:
-		return []
-	else:
-		first_idx = string.index(sub)
-		output = [first_idx]
-		for idx in indices(string[first_idx+len(sub):], sub):
-			output.append(first_idx+len(sub)+idx)
-		return output
+        if self._consts is None:
+            if self.ctgy == 'const':
+                output = frozenset([self.value])
+            elif self.ctgy == 'var':
+                output = frozenset()
+            elif self.ctgy == 'func':
+                output = frozenset().union(*[sub.consts() for sub in self.sub])
+            object.__setattr__(self, '_consts', output)
+        return self._consts
 
 class Pred_Form:
-    def __init__(self, ctgy, value, sub):
-        self.ctgy = ctgy
-        self.name = value
-        self.value = value
-        self.sub = sub
+    """
+    Formulas are hash-consed: building a formula equal to an existing one returns
+    that same object, so eq_syntax is an identity check.
+    Being immutable, a formula also keeps its LaTeX once computed.
+    A quantification also has its quantifier and variable apart, e.g. '\\forall' and 'x' for the value '\\forall x.'.
+    """
+    __slots__ = ('ctgy', 'name', 'value', 'sub', 'quantifier', 'var', '_hash', '_free', '_consts', '_alpha', '_latex', '__weakref__')
+    _interned = weakref.WeakValueDictionary()
+    _intern_lock = threading.Lock()
+    def __new__(cls, ctgy, value, sub):
+        sub = tuple(sub)
+        key = (ctgy, value, sub)
+        with cls._intern_lock:
+            form = cls._interned.get(key)
+            if form is None:
+                form = object.__new__(cls)
+                object.__setattr__(form, 'ctgy', ctgy)
+                object.__setattr__(form, 'name', value)
+                object.__setattr__(form, 'value', value)
+                object.__setattr__(form, 'sub', sub)
+                if ctgy == 'quant':
+                    object.__setattr__(form, 'quantifier', value[:-3])
+                    object.__setattr__(form, 'var', value[-2])
+                else:
+                    object.__setattr__(form, 'quantifier', None)
+                    object.__setattr__(form, 'var', None)
+                object.__setattr__(form, '_hash', hash(key))
+                object.__setattr__(form, '_free', None)
+                object.__setattr__(form, '_consts', None)
+                object.__setattr__(form, '_alpha', None)
+                object.__setattr__(form, '_latex', None)
+                cls._interned[key] = form
+        return form
+    def __setattr__(self, attr, value):
+        raise LogicError('trying to modify a Pred_Form, which is immutable')
+    def __hash__(self):
+        return self._hash
+    def __reduce__(self):
+        return (Pred_Form, (self.ctgy, self.value, self.sub))
     def __repr__(self):
-        return f'Pred_Form({self.ctgy}, {self.value}, {self.sub})'
+        return f'Pred_Form({self.ctgy}, {self.value}, {list(self.sub)})'
     def eq_syntax(self,other):
         if not isinstance(other, Pred_Form):
             return False
-        return self.latex() == other.latex()
+        return self is other
     def latex(self):
-        if self.ctgy == 'identity':
-            return f'({self.sub[0].latex()} = {self.sub[1].latex()})'
-        if self.ctgy == 'pred':
-            output = f'{self.value}('
-            for sub in self.sub:
-                output += sub.latex() + ','
-            output = output[:-1] + ')'
-            return output
-        if self.ctgy == 'quant':
-            return f'{self.value[:-1]} {self.sub[0].latex()}'
-        if self.ctgy == 'conn':
-            if self.value in zeroary:
-                return self.value
+        if self._latex is None:
+            if self.ctgy == 'identity':
+                output = f'({self.sub[0].latex()} = {self.sub[1].latex()})'
+            elif self.ctgy == 'pred':
+                output = f'{self.value}(' + ','.join(sub.latex() for sub in self.sub) + ')'
+            elif self.ctgy == 'quant':
+                output = f'{self.value[:-1]} {self.sub[0].latex()}'
+            elif self.value in zeroary:
+                output = self.value
             elif self.value in unary:
-                return rf'{self.value} {self.sub[0].latex()}'
+                output = rf'{self.value} {self.sub[0].latex()}'
             else:
-                return f'({self.sub[0].latex()} {self.value} {self.sub[1].latex()})'
+                output = f'({self.sub[0].latex()} {self.value} {self.sub[1].latex()})'
+            object.__setattr__(self, '_latex', output)
+        return self._latex
     def free(self):
-        def aux(self, bound_so_far):
-            if self.ctgy == 'identity':
-                return (self.sub[0].free()|self.sub[1].free()) - bound_so_far
-            if self.ctgy == 'pred':
-                output = set([])
-                for sub in self.sub:
-                    output = output | sub.free()
-                return output - bound_so_far
+        if self._free is None:
             if self.ctgy == 'quant':
-                return aux(self.sub[0],bound_so_far|{self.value[-2]})
-            if self.ctgy == 'conn':
-                output = set([])
-                for sub in self.sub:
-                    output = output | aux(sub, bound_so_far)
-                return output
-        return aux(self, set([]))
+                output = self.sub[0].free() - {self.var}
+            else:
+                output = frozenset().union(*[sub.free() for sub in self.sub])
+            object.__setattr__(self, '_free', output)
+        return self._free
     def consts(self):
-        output = []
-        for sub in self.sub:
-            output += sub.consts()
-        return output
+        if self._consts is None:
+            output = frozenset().union(*[sub.consts() for sub in self.sub])
+            object.__setattr__(self, '_consts', output)
+        return self._consts
+    def alpha_key(self):
+        """
+        A key shared by exactly the alpha-equivalent formulas: each bound variable is replaced by
+        its de Bruijn index (how many quantifiers up its binder is), free variables keep their names
+        """
+        return alpha_key(self, {}, 0)
+    def alpha_eq(self, other):
+        if not isinstance(other, Pred_Form):
+            return False
+        return self is other or self.alpha_key() == other.alpha_key()
     def parse(string):
-        string = string.replace(' ', '')
-        string = string.replace(r'\rightarrow', r'\to')
-        string = string.replace(r'\all', r'\forall')
-        string = string.replace(r'\land', r'\wedge')
-        string = string.replace(r'\lor', r'\vee')
-
-        for conn in zeroary:
-            if string == conn:
-                return Pred_Form('conn', conn, [])
-
-        if len(string) <= 2:
-            raise FormulaError(ParsingError.note)
-
-        p_balance = 0
-        for char in string:
-
-            if char == '(':
-                p_balance += 1
-            elif char == ')':
-                p_balance -= 1
-            
-            if p_balance < 0:
-                raise FormulaError(ParsingError.note)
-        if p_balance != 0:
-            FormulaError(ParsingError.note)
-
-        if string[0] == '(' and string[-1] == ')':
-            try:
-                return Pred_Form.parse(string[1:-1])
-            except ParsingError:
-                pass
-
-        for conn in binary:
-            for conn_idx in indices(string, conn):
-                before_conn = string[:conn_idx]
-                after_conn = string[conn_idx+len(conn):]
-                try:
-                    return Pred_Form('conn', conn, [Pred_Form.parse(before_conn), Pred_Form.parse(after_conn)])
-                except ParsingError:
-                    pass
-        
-        for conn in unary:
-            if len(string) > len(conn) and conn == string[:len(conn)]:
-                try:
-                    return Pred_Form('conn', conn, [Pred_Form.parse(string[len(conn):])])
-                except ParsingError:
-                    pass
-
-        for q in quants:
-            if len(string) > len(q)+2 and q == string[:len(q)]:
-                try:
-                    return Pred_Form('quant', f'{q} {string[len(q)]}.', [Pred_Form.parse(string[len(q)+1:])])
-                except ParsingError:
-                    pass
-
-        if string[1] == '(' and string[-1] == ')':
-            pred_name = string[0]
-            if (ord('A') <= ord(pred_name) <= ord('Z')):
-                try:
-                    return Pred_Form('pred', pred_name, list(map(Pred_Term.parse, string[2:-1].split(','))))
-                except ParsingError:
-                    pass
-
-        if '=' in string:
-            eq_idx = string.index('=')
-            before_eq = string[:eq_idx]
-            after_eq = string[eq_idx+1:]
-            try:
-                return Pred_Form('identity', '=', [Pred_Term.parse(before_eq), Pred_Term.parse(after_eq)])
-            except ParsingError:
-                pass
-        
-        raise FormulaError(ParsingError.note)
+        """
+        Binary connectives bind more tightly the later they appear in symbols.binary
+        and associate to the right; negations and quantifiers scope over the smallest
+        formula that follows them.
+        """
+        tokens = tokenize(string)
+        operands = []
+        operators = []
+
+        def reduce():
+            kind, value, _ = operators.pop()
+            if kind == 'binary':
+                right = operands.pop()
+                left = operands.pop()
+                operands.append(Pred_Form('conn', value, [left, right]))
+            elif kind == 'unary':
+                operands.append(Pred_Form('conn', value, [operands.pop()]))
+            else:
+                operands.append(Pred_Form('quant', value, [operands.pop()]))
+
+        expect_operand = True
+        i = 0
+        while True:
+            token = tokens[i]
+            kind, value, position = token
+            if expect_operand:
+                if kind == 'atom':
+                    operands.append(Pred_Form('conn', value, []))
+                    expect_operand = False
+                    i += 1
+                elif kind == 'unary' or kind == '(':
+                    operators.append(token)
+                    i += 1
+                elif kind == 'quant':
+                    var_kind, var_name, var_position = tokens[i+1]
+                    # quantifying over the constant c is vacuous, but the parser has always let it through
+                    if var_kind != 'symbol' and not (var_kind == 'const' and var_name == 'c'):
+                        raise FormulaError.at(string, var_position)
+                    operators.append(('quant', f'{value} {var_name}.', position))
+                    i += 2
+                elif kind == 'symbol' or kind == 'const':
+                    term, i = parse_term(string, tokens, i)
+                    if tokens[i][0] == '=':
+                        other, i = parse_term(string, tokens, i+1)
+                        operands.append(Pred_Form('identity', '=', [term, other]))
+                    elif term.ctgy == 'func' and ord('A') <= ord(term.value) <= ord('Z'):
+                        operands.append(Pred_Form('pred', term.value, term.sub))
+                    else:
+                        raise FormulaError.at(string, tokens[i][2])
+                    expect_operand = False
+                else:
+                    raise FormulaError.at(string, position)
+            elif kind == 'binary':
+                while len(operators) > 0 and operators[-1][0] != '(' and (operators[-1][0] != 'binary' or precedence[operators[-1][1]] > precedence[value]):
+                    reduce()
+                operators.append(token)
+                expect_operand = True
+                i += 1
+            elif kind == ')':
+                while len(operators) > 0 and operators[-1][0] != '(':
+                    reduce()
+                if len(operators) == 0:
+                    raise FormulaError.at(string, position)
+                operators.pop()
+                i += 1
+            elif kind == 'end':
+                while len(operators) > 0:
+                    if operators[-1][0] == '(':
+                        raise FormulaError.at(string, operators[-1][2])
+                    reduce()
+                return operands[0]
+            else:
+                raise FormulaError.at(string, position)
 
 class SubstitutionError(LogicError):
     pass
 
 def substitutable(tree, var, term_free):
     """
-    var should be input as a string
+    var should be input as a string \n
+    Checks that no free occurrence of var in tree is under a quantifier binding a variable of term_free.
+    Subformulas where var is not free are skipped using their cached free variables.
     """
-    def aux(tree, var, term_free, bound_so_far):
-        """substitute term for var in tree"""
-        if tree.ctgy == "identity" or tree.ctgy == 'pred':
-            if var in tree.__repr__():
-                output = True
-                for term_variable in term_free:
-                    output = output and not (term_variable in bound_so_far)
-                return output
-            else:
-                return True
-        if tree.ctgy == "quant":
-            y = tree.value.split(" ")[1][:-1]
-            if y == var:
-                return True
-            else:
-                return aux(tree.sub[0], var, term_free, bound_so_far|{y})
-        if tree.ctgy == "conn":
-            output = True
-            for sub_tree in tree.sub:
-                output = output and aux(sub_tree, var, term_free, bound_so_far)
-            return output
-    return aux(tree, var, term_free, set())
+    if var not in tree.free():
+        return True
+    if tree.ctgy == "identity" or tree.ctgy == "pred":
+        return True
+    if tree.ctgy == "quant":
+        return tree.var not in term_free and substitutable(tree.sub[0], var, term_free)
+    for sub_tree in tree.sub:
+        if not substitutable(sub_tree, var, term_free):
+            return False
+    return True
 
 def substitute_term(tree, var, term):
-    if tree.ctgy == "const":
+    if var not in tree.free():
         return tree
     if tree.ctgy == "var":
-        if tree.value == var:
-            return term
-        else:
-            return tree
-    return Pred_Term(
-        tree.ctgy,
-        tree.value,
-        list(
-            map(
-                lambda subtree: substitute_term(subtree, var, term),
-                tree.sub
-                )
-            )
-        )
+        return term
+    return Pred_Term(tree.ctgy, tree.value, [substitute_term(subtree, var, term) for subtree in tree.sub])
 
+@functools.lru_cache(maxsize=4096)
 def substitute_form(tree, var, term):
     """
     var should be input as a string \n
-    term should be a tree
+    term should be a tree \n
+    Formulas and terms are hash-consed, so results are memoized on (tree, var, term) identity.
     """
-    term_free = term.free()
-    if not substitutable(tree, var, term_free):
+    if not substitutable(tree, var, term.free()):
         raise SubstitutionError('trying to substitute something that is not substitutable')
-    if tree.ctgy=="identity" or tree.ctgy == "pred":
-        return Pred_Form(
-            tree.ctgy, 
-            tree.value, 
-            list(map(lambda subterm: substitute_term(subterm, var, term), tree.sub))
-            )
-    if tree.ctgy=="conn":
-        return Pred_Form(
-            tree.ctgy, 
-            tree.value, 
-            list(map(lambda subterm: substitute_form(subterm, var, term), tree.sub))
-            )
-    if tree.ctgy == "quant":
-        variable = tree.value.split(" ")[1][:-1]
-        if variable in term_free: return tree
-        if variable == var: return tree
-        else: return Pred_Form(
-            tree.ctgy, 
-            tree.value, 
-            list(map(lambda subterm: substitute_form(subterm, var, term), tree.sub))
-            )
+    return substitute_free(tree, var, term)
+
+def substitute_free(tree, var, term):
+    """
+    Replaces the free occurrences of var in tree by term, in one pass
+    """
+    if var not in tree.free():
+        return tree
+    if tree.ctgy == "identity" or tree.ctgy == "pred":
+        return Pred_Form(tree.ctgy, tree.value, [substitute_term(subterm, var, term) for subterm in tree.sub])
+    return Pred_Form(tree.ctgy, tree.value, [substitute_free(subtree, var, term) for subtree in tree.sub])
 
 def substitute_TT_term(tree, t1, t2):
     """
@@ -311,27 +441,6 @@ def substitute_TT_term(tree, t1, t2):
             )
         )
 
-def all_substitute_TT_term(tree, t1, t2):
-    """
-    t1 old
-    t2 new
-    """
-    if tree.eq_syntax(t1):
-        return [t2]
-    elif tree.sub == None:
-        return [tree]
-    else:
-        output = []
-        for TF_lst in all_TF_lst(len(tree.sub)):
-            new_sub = []
-            for boolean, subtree in zip(TF_lst, tree.sub):
-                if boolean:
-                    new_sub.append(substitute_TT_term(subtree, t1, t2))
-                else:
-                    new_sub.append(subtree)
-            output.append(Pred_Form(tree.ctgy, tree.value, new_sub))
-        return output
-
 def substitute_TT_form(tree, t1, t2):
     if tree.ctgy=="identity" or tree.ctgy == "pred":
         return Pred_Form(
@@ -367,183 +476,103 @@ def substitute_TT_form(tree, t1, t2):
             )
         )
 
-def all_substitute_TT_form(tree, t1, t2):
-    if tree.ctgy=="identity" or tree.ctgy == "pred":
-        output = []
-        for TF_lst in all_TF_lst(len(tree.sub)):
-            new_sub = []
-            for boolean, subtree in zip(TF_lst, tree.sub):
-                if boolean:
-                    new_sub.append(substitute_TT_term(subtree, t1, t2))
-                else:
-                    new_sub.append(subtree)
-            output.append(Pred_Form(tree.ctgy, tree.value, new_sub))
-        return output
-    if tree.ctgy=="conn":
-        output = []
-        for TF_lst in all_TF_lst(len(tree.sub)):
-            new_sub = []
-            for boolean, subtree in zip(TF_lst, tree.sub):
-                if boolean:
-                    new_sub.append(substitute_TT_form(subtree, t1, t2))
-                else:
-                    new_sub.append(subtree)
-            output.append(Pred_Form(tree.ctgy, tree.value, new_sub))
-        return output
-    if tree.ctgy == "quant":
-        output = []
-        for TF_lst in all_TF_lst(len(tree.sub)):
-            new_sub = []
-            for boolean, subtree in zip(TF_lst, tree.sub):
-                if boolean:
-                    new_sub.append(substitute_TT_form(subtree, t1, t2))
-                else:
-                    new_sub.append(subtree)
-            output.append(Pred_Form(tree.ctgy, tree.value, new_sub))
-        return output
-
-def all_TF_lst(n):
-    if n == 0:
-        return [[]]
-    sub = all_TF_lst(n-1)
-    output = []
-    for lst in sub:
-        output.append([True]+lst)
-        output.append([False]+lst)
-    return output
-
-def all_substitute_term(tree, var, term):
-    if tree.ctgy == "const":
-        return tree
-    if tree.ctgy == "var":
-        output = [tree]
-        if tree.value == var:
-            output.append(term)
-        return output
-    if tree.ctgy =='func':
-        output = []
-        for TF_lst in all_TF_lst(len(tree.sub)):
-            new_sub = []
-            for boolean, subtree in zip(TF_lst, tree.sub):
-                if boolean:
-                    new_sub.append(substitute_term(subtree, var, term))
-                else:
-                    new_sub.append(subtree)
-            output.append(Pred_Term(tree.ctgy, tree.value, new_sub))
-        return output
+def substitute_compare_TT(unsubbed, subbed, t1, t2):
+    """
+    Checks that subbed is unsubbed with any number of free occurrences of the term t1 replaced by t2.
+    Both formulas are walked together once; since they are hash-consed, equal parts are skipped at once.
+    An occurrence can't be replaced under a quantifier that binds a variable of t1 or t2.
+    """
+    bound_vars = t1.free() | t2.free()
 
-def all_substitute_form(tree, var, term):
-    term_free = term.free()
-    if not substitutable(tree, var, term_free):
-        raise SubstitutionError('trying to substitute something that is not substitutable')
-    if tree.ctgy=="identity" or tree.ctgy == "pred":
-        output = []
-        for TF_lst in all_TF_lst(len(tree.sub)):
-            new_sub = []
-            for boolean, subtree in zip(TF_lst, tree.sub):
-                if boolean:
-                    new_sub.append(substitute_term(subtree, var, term))
-                else:
-                    new_sub.append(subtree)
-            output.append(Pred_Form(tree.ctgy, tree.value, new_sub))
-        return output
-    if tree.ctgy=="conn":
-        output = []
-        for TF_lst in all_TF_lst(len(tree.sub)):
-            new_sub = []
-            for boolean, subtree in zip(TF_lst, tree.sub):
-                if boolean:
-                    new_sub.append(substitute_form(subtree, var, term))
-                else:
-                    new_sub.append(subtree)
-            output.append(Pred_Form(tree.ctgy, tree.value, new_sub))
-        return output
-    if tree.ctgy == "quant":
-        variable = tree.value.split(" ")[1][:-1]
-        if variable in term_free: return [tree]
-        if variable == var: return [tree]
-        else: 
-            output = []
-            for TF_lst in all_TF_lst(len(tree.sub)):
-                new_sub = []
-                for boolean, subtree in zip(TF_lst, tree.sub):
-                    if boolean:
-                        new_sub.append(substitute_form(subtree, var, term))
-                    else:
-                        new_sub.append(subtree)
-                output.append(Pred_Form(tree.ctgy, tree.value, new_sub))
-            return output
-
-def substitute_compare_term(unsubbed, subbed, var_name):
-    if unsubbed.ctgy == 'const':
-        if unsubbed.eq_syntax(subbed):
-            return []
-        else:
-            return [None]
-    elif unsubbed.ctgy == 'var':
-        if unsubbed.value == var_name:
-            return [subbed]
-        else:
-            if unsubbed.eq_syntax(subbed):
-                return []
-            else:
-                return [None]
-    else:
-        if not (unsubbed.ctgy == subbed.ctgy):
-            return [None]
-        if not (len(unsubbed.sub) == len(subbed.sub)):
-            return [None]
-        output = []
-        for unsubbed_sub, subbed_sub in zip(unsubbed.sub, subbed.sub):
-            output += substitute_compare_term(unsubbed_sub, subbed_sub, var_name)
-        return output
-    
-def substitute_compare_form(unsubbed, subbed, var_name):
-    if unsubbed.ctgy=="identity" or unsubbed.ctgy == "pred":
-        if not (unsubbed.ctgy == subbed.ctgy):
-            return [None]
-        if not (len(unsubbed.sub) == len(subbed.sub)):
-            return [None]
-        if unsubbed.value != subbed.value:
-            return [None]
-        output = []
+    def compare_term(unsubbed, subbed):
+        if unsubbed is subbed:
+            return True
+        if unsubbed is t1 and subbed is t2:
+            return True
+        if unsubbed.ctgy != 'func' or unsubbed.ctgy != subbed.ctgy or unsubbed.value != subbed.value or len(unsubbed.sub) != len(subbed.sub):
+            return False
         for unsubbed_sub, subbed_sub in zip(unsubbed.sub, subbed.sub):
-            output += substitute_compare_term(unsubbed_sub, subbed_sub, var_name)
-        return output
-    if unsubbed.ctgy=="conn":
-        if not (unsubbed.ctgy == subbed.ctgy):
-            return [None]
-        if not (len(unsubbed.sub) == len(subbed.sub)):
-            return [None]
-        output = []
+            if not compare_term(unsubbed_sub, subbed_sub):
+                return False
+        return True
+
+    def compare_form(unsubbed, subbed):
+        if unsubbed is subbed:
+            return True
+        if unsubbed.ctgy != subbed.ctgy or unsubbed.value != subbed.value or len(unsubbed.sub) != len(subbed.sub):
+            return False
+        if unsubbed.ctgy == 'quant' and unsubbed.var in bound_vars:
+            return False
+        compare_sub = compare_term if unsubbed.ctgy == 'identity' or unsubbed.ctgy == 'pred' else compare_form
         for unsubbed_sub, subbed_sub in zip(unsubbed.sub, subbed.sub):
-            output += substitute_compare_form(unsubbed_sub, subbed_sub, var_name)
-        return output
-    if unsubbed.ctgy == "quant":
-        if not (unsubbed.ctgy == subbed.ctgy):
-            return [None]
-        quant_var = unsubbed.value[-2]
-        if quant_var == var_name:
-            if unsubbed.eq_syntax(subbed):
-                return []
-            else:
-                return [None]
-        else:
-            if not (unsubbed.value == subbed.value):
-                return [None]
-            return substitute_compare_form(unsubbed.sub[0], subbed.sub[0], var_name)
-        
-def substitute_compare_total(unsubbed, subbed, var_name):
-    lst = substitute_compare_form(unsubbed, subbed, var_name)
-    if len(lst) == 0:
+            if not compare_sub(unsubbed_sub, subbed_sub):
+                return False
         return True
-    if None in lst:
+
+    return compare_form(unsubbed, subbed)
+
+class MatchError(LogicError):
+    def __init__(self, message, path):
+        super().__init__(message)
+        self.path = path
+
+def match_instance(unsubbed, subbed, var_name):
+    """
+    Finds the term t such that subbed is unsubbed with t substituted for the free occurrences of var_name,
+    walking both once. Returns None if var_name is not free in unsubbed, since then any term fits.
+    Otherwise raises a MatchError whose path lists the positions of the subformulas and subterms,
+    from the top, leading to the first mismatch.
+    """
+    witness = None
+    path = []
+
+    def mismatch(message):
+        return MatchError(message, tuple(path))
+
+    def match_term(unsubbed, subbed, bound):
+        nonlocal witness
+        if unsubbed.ctgy == 'var' and unsubbed.value == var_name:
+            if witness is None:
+                witness = subbed
+            elif subbed is not witness:
+                raise mismatch(f'different terms are substituted for {var_name}.')
+            if not witness.free().isdisjoint(bound):
+                raise mismatch(f'the term substituted for {var_name} would be bound by a quantifier.')
+            return
+        if var_name not in unsubbed.free():
+            if unsubbed is not subbed:
+                raise mismatch('the terms differ.')
+            return
+        if subbed.ctgy != 'func' or unsubbed.value != subbed.value or len(unsubbed.sub) != len(subbed.sub):
+            raise mismatch('the terms differ.')
+        for (i, (unsubbed_sub, subbed_sub)) in enumerate(zip(unsubbed.sub, subbed.sub)):
+            path.append(i)
+            match_term(unsubbed_sub, subbed_sub, bound)
+            path.pop()
+
+    def match_form(unsubbed, subbed, bound):
+        if var_name not in unsubbed.free():
+            if unsubbed is not subbed:
+                raise mismatch('the formulas differ.')
+            return
+        if unsubbed.ctgy != subbed.ctgy or unsubbed.value != subbed.value or len(unsubbed.sub) != len(subbed.sub):
+            raise mismatch('the formulas differ.')
+        if unsubbed.ctgy == 'quant':
+            bound = bound | {unsubbed.var}
+        match_sub = match_term if unsubbed.ctgy == 'identity' or unsubbed.ctgy == 'pred' else match_form
+        for (i, (unsubbed_sub, subbed_sub)) in enumerate(zip(unsubbed.sub, subbed.sub)):
+            path.append(i)
+            match_sub(unsubbed_sub, subbed_sub, bound)
+            path.pop()
+
+    match_form(unsubbed, subbed, frozenset())
+    return witness
+
+def substitute_compare_total(unsubbed, subbed, var_name):
+    try:
+        match_instance(unsubbed, subbed, var_name)
+    except MatchError:
         return False
-    output = True
-    t = lst[0]
-    for t_prime in lst[1:]:
-        output = output and t.eq_syntax(t_prime)
-    output = output and substitutable(unsubbed, var_name, t.free())
-    return output
+    return True
 
 # print(substitute_compare_total(Pred_Form.parse(r'P(x)'), Pred_Form.parse(r'Q(c)'), 'x'))
\ No newline at end of file
@@ -11,6 +11,9 @@ class Blank():
     def latex(self):
         return ''
 
+    def consts(self):
+        return frozenset()
+
 class ProofLine():
     pass
 
@@ -45,7 +48,7 @@ class UnivIntroAssumptionLine(AssumptionLine):
         self.const_name = const_name
     
     def consts(self):
-        return [self.const_name]
+        return frozenset([self.const_name])
 
 class ExistElimAssumptionLine(AssumptionLine):
     def __init__(self, formula, const_name):
@@ -61,7 +64,7 @@ class ExistElimAssumptionLine(AssumptionLine):
         self.const_name = const_name
     
     def consts(self):
-        return self.formula.consts() + [self.const_name]
+        return self.formula.consts() | {self.const_name}
 
 class DeductionLine(ProofLine):
     def __init__(self, formula, rule):
@@ -72,6 +75,8 @@ class DeductionLine(ProofLine):
         self.formula = formula
         self.rule = rule
         self.parent_proof = None
+        # the cited lines themselves (or the number, for a citation that can't be resolved), set by the proof
+        self.citations = None
     
     def __repr__(self):
         return f'DeductionLine({self.formula.__repr__()}, {self.rule.__repr__()})'
@@ -79,6 +84,7 @@ class DeductionLine(ProofLine):
     def change(self, formula, rule):
         self.formula = formula
         self.rule = rule
+        self.citations = None
     
     def consts(self):
         return self.formula.consts()
\ No newline at end of file
@@ -0,0 +1,8 @@
+from pred.schemas import *
+import os
+
+# see rulebook.py for the format of the file
+rulesets, default_ruleset = load_rulesets(rulesets_file, 'pred')
+ruleset_name = os.environ.get('FITCH_PRED_RULESET', default_ruleset)
+if ruleset_name not in rulesets:
+    raise RulesetError(f'there is no predicate rule set {ruleset_name} in {rulesets_file}')
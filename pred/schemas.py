@@ -0,0 +1,29 @@
+from pred.formula import *
+from rulebook import *
+
+# the built-in rules as schemas, in the language described in rulebook.py
+schemas = {
+    r'\wedge E': r'cite A \wedge B; conclude A | cite A \wedge B; conclude B',
+    r'\wedge I': r'cite A, cite B; conclude A \wedge B',
+    r'\vee E': r'cite A \vee B, cite [A ... C], cite [B ... C]; conclude C',
+    r'\vee I': r'cite A; conclude A \vee B | cite B; conclude A \vee B',
+    r'\to E': r'cite A \to B, cite A; conclude B',
+    r'\to I': r'cite [A ... B]; conclude A \to B',
+    r'\neg E': r'cite \neg A; conclude A \to B',
+    r'\neg I': r'cite [A ... \bot]; conclude \neg A | cite [A ... B \wedge \neg B]; conclude \neg A | cite [A ... \neg B \wedge B]; conclude \neg A',
+    r'\leftrightarrow E': r'cite A \leftrightarrow B, cite A; conclude B | cite A \leftrightarrow B, cite B; conclude A',
+    r'\leftrightarrow I': r'cite [A ... B], cite [B ... A]; conclude A \leftrightarrow B | cite [A ... B], cite [B ... A]; conclude B \leftrightarrow A',
+    r'\bot E': r'cite \bot; conclude A',
+    r'\bot I': r'cite A, cite \neg A; conclude \bot',
+    r'RAA': r'cite [\neg A ... \bot]; conclude A | cite [\neg A ... B \wedge \neg B]; conclude A | cite [\neg A ... \neg B \wedge B]; conclude A',
+    r'EFQ': r'cite A \wedge \neg A; conclude B | cite \neg A \wedge A; conclude B',
+    r'R': r'cite A; conclude A',
+}
+# the quantifier and identity rules depend on substitution, so they only have their checkers
+
+# derived rules an instructor can switch on with checkers.define_rule
+derived_schemas = {
+    r'MT': r'cite A \to B, cite \neg B; conclude \neg A',
+    r'DS': r'cite A \vee B, cite \neg A; conclude B | cite A \vee B, cite \neg B; conclude A',
+    r'DN': r'cite \neg \neg A; conclude A',
+}
@@ -0,0 +1,52 @@
+import functools
+
+# The HTML view of a proof, shared by both logics. It goes through st.markdown, so the formulas are typeset
+# by the KaTeX that ships with Streamlit, as st.latex is: nothing is loaded from another server.
+# Markdown, math included, is only read inside an HTML element when blank lines set it apart,
+# hence the blank lines around the content of each row.
+style = """<style>
+.fitch-row p {display: flex; min-height: 2.2em; margin: 0;}
+.fitch-num {width: 2.5em; padding-right: 0.8em; text-align: right; align-self: center;}
+.fitch-bar {width: 0.8em; flex: none; border-left: 1px solid;}
+.fitch-formula {flex: 1; align-self: center;}
+.fitch-rule {width: 10em; align-self: center;}
+.fitch-hline {display: inline-block; min-width: 4em; padding-right: 1em; border-bottom: 1px solid;}
+</style>
+
+"""
+
+bar = '<span class="fitch-bar"></span>'
+
+@functools.lru_cache(maxsize=4096)
+def math_snippet(tex, css_class):
+    """
+    A span holding tex as inline math; a formula comes out the same in every proof and every rerun, so it is built once.
+    """
+    if len(tex) == 0:
+        return f'<span class="{css_class}"></span>'
+    return f'<span class="{css_class}">${tex}$</span>'
+
+def html_row(number, depth, formula, rule, underlined):
+    formula_class = 'fitch-formula fitch-hline' if underlined else 'fitch-formula'
+    return f'<div class="fitch-row">\n\n<span class="fitch-num">{number}</span>{bar*depth}{math_snippet(formula, formula_class)}{math_snippet(rule, "fitch-rule")}\n\n</div>\n'
+
+def proof_html(proof):
+    """
+    The proof as HTML with one row per line, for pages where one big LaTeX array is slow to typeset.
+    Scope bars are borders and each formula and rule is a small snippet of math,
+    built from the same cached LaTeX as latex().
+    """
+    main = proof.main_proof()
+    line_numbers = proof.index()[1]
+    rows = [style]
+    html_rows(rows, proof, main, line_numbers, 1)
+    return ''.join(rows)
+
+def html_rows(rows, proof, main, line_numbers, depth):
+    for (i, a) in enumerate(proof.assumptions):
+        rows.append(html_row(line_numbers[a], depth, main._line_latex(a), '', i == len(proof.assumptions)-1))
+    for subproof in proof.subproofs:
+        if isinstance(subproof, type(proof)):
+            html_rows(rows, subproof, main, line_numbers, depth+1)
+        else:
+            rows.append(html_row(line_numbers[subproof], depth, main._line_latex(subproof), main._rule_latex(subproof, line_numbers), False))
@@ -1,34 +1,83 @@
 from prop.symbols import *
+import threading
+import weakref
 
 class ParsingError(LogicError):
     note = "We couldn't parse the above formula. Are you sure it's written in LaTeX with lowercase letters?"
-    pass
+
+    def __init__(self, message, position=None):
+        super().__init__(message)
+        self.position = position
+
+    @classmethod
+    def at(cls, string, position):
+        if position >= len(string.rstrip()):
+            hint = 'The formula seems to end too early.'
+        else:
+            hint = f'The problem seems to be at character {position+1}.'
+        return cls(f'{ParsingError.note} {hint}', position)
+
+aliases = {
+    r'\rightarrow': r'\to',
+    r'\land': r'\wedge',
+    r'\lor': r'\vee',
+}
+
+spellings = {conn: conn for conn in zeroary + unary + binary}
+spellings.update(aliases)
+spellings = dict(sorted(spellings.items(), key=lambda item: -len(item[0])))
+
+precedence = {conn: i for (i, conn) in enumerate(binary)}
 
 class PropNode():
-    def __init__(self, name, sub):
-        self.name = name
-        self.sub = sub
+    """
+    PropNodes are hash-consed: building a node whose name and subnodes match an
+    existing node returns that same node, so syntactic equality is identity.
+    Being immutable, a node also keeps its LaTeX once computed.
+    """
+    __slots__ = ('name', 'sub', '_hash', '_latex', '__weakref__')
+
+    _interned = weakref.WeakValueDictionary()
+    _intern_lock = threading.Lock()
+
+    def __new__(cls, name, sub):
+        sub = tuple(sub)
+        key = (name, sub)
+        with cls._intern_lock:
+            node = cls._interned.get(key)
+            if node is None:
+                node = object.__new__(cls)
+                object.__setattr__(node, 'name', name)
+                object.__setattr__(node, 'sub', sub)
+                object.__setattr__(node, '_hash', hash(key))
+                object.__setattr__(node, '_latex', None)
+                cls._interned[key] = node
+        return node
+
+    def __setattr__(self, attr, value):
+        raise LogicError('trying to modify a PropNode, which is immutable')
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (PropNode, (self.name, self.sub))
     
     def eq_syntax(self, other):
         if not isinstance(other, PropNode):
             raise LogicError('trying to check eq_syntax for something other than a PropNode')
-        if not (self.name == other.name):
-            return False
-        if len(self.sub) != len(other.sub):
-            return False
-        
-        output = True
-        for (self_subproof, other_subproof) in zip(self.sub, other.sub):
-            output = output and self_subproof.eq_syntax(other_subproof)
-        return output
+        return self is other
 
     def latex(self):
-        if len(self.sub) == 0:
-            return self.name
-        elif len(self.sub) == 1:
-            return f'{self.name} {self.sub[0].latex()}'
-        else:
-            return f'({self.sub[0].latex()} {self.name} {self.sub[1].latex()})'
+        if self._latex is None:
+            if len(self.sub) == 0:
+                output = self.name
+            elif len(self.sub) == 1:
+                output = f'{self.name} {self.sub[0].latex()}'
+            else:
+                output = f'({self.sub[0].latex()} {self.name} {self.sub[1].latex()})'
+            object.__setattr__(self, '_latex', output)
+        return self._latex
     
     def __repr__(self):
         output = f"PropNode('{self.name}', ["
@@ -39,95 +88,130 @@ class PropNode():
         output += '])'
         return output
 
+    def tokenize(string):
+        # spaces are dropped before anything else, as the parser always did, so "\n eg p" reads as "\neg p";
+        # kept[i] is where the i-th remaining character was in string, for the error messages
+        kept = [i for (i, char) in enumerate(string) if not char.isspace()]
+        text = ''.join(string[i] for i in kept)
+        kept.append(len(string))
+        tokens = []
+        i = 0
+        while i < len(text):
+            char = text[i]
+            if char == '(' or char == ')':
+                tokens.append((char, char, kept[i]))
+                i += 1
+            elif ord('a') <= ord(char) <= ord('z'):
+                tokens.append(('atom', char, kept[i]))
+                i += 1
+            elif char == '\\':
+                for spelling, conn in spellings.items():
+                    if text.startswith(spelling, i):
+                        break
+                else:
+                    raise ParsingError.at(string, kept[i])
+                if conn in zeroary:
+                    tokens.append(('atom', conn, kept[i]))
+                elif conn in unary:
+                    tokens.append(('unary', conn, kept[i]))
+                else:
+                    tokens.append(('binary', conn, kept[i]))
+                i += len(spelling)
+            else:
+                raise ParsingError.at(string, kept[i])
+        tokens.append(('end', None, len(string)))
+        return tokens
+
     def parse(string):
-        string = string.replace(' ', '')
-        string = string.replace(r'\rightarrow', r'\to')
-        string = string.replace(r'\land', r'\wedge')
-        string = string.replace(r'\lor', r'\vee')
-
-        if len(string) == 1:
-            if (ord('a') <= ord(string) <= ord('z')):
-                return PropNode(string.lower(), [])
+        """
+        Without parentheses, binary connectives bind more tightly the later they appear in symbols.binary
+        and associate to the right; negation binds most tightly of all.
+        A parenthesized formula is taken with the connectives right before and after it, whatever they are,
+        with everything before it as the left operand and everything after it as the right one,
+        so r \\vee p \\to (r \\vee r) \\wedge q reads as ((r \\vee p) \\to (r \\vee r)) \\wedge q.
+        """
+        # each level of parentheses is read from left to right as left operands and their connectives (chain),
+        # the tokens since the last parenthesized formula (segment) and the value of that formula, if it ends the level
+        levels = []
+        chain, segment, value, opened = [], [], None, None
+        for token in PropNode.tokenize(string):
+            kind, conn, position = token
+            if kind == ')' or kind == 'end':
+                if value is None:
+                    value = PropNode.parse_plain(string, segment, token)
+                for (left, left_conn) in reversed(chain):
+                    value = PropNode(left_conn, [left, value])
+                if kind == 'end':
+                    if opened is not None:
+                        raise ParsingError.at(string, opened)
+                    return value
+                if opened is None:
+                    raise ParsingError.at(string, position)
+                group, group_position = value, opened
+                chain, segment, value, opened = levels.pop()
+                value = PropNode.parse_before(string, segment, group, group_position)
+            elif value is not None:
+                if kind != 'binary':
+                    raise ParsingError.at(string, position)
+                chain.append((value, conn))
+                segment, value = [], None
+            elif kind == '(':
+                levels.append((chain, segment, value, opened))
+                chain, segment, value, opened = [], [], None, position
             else:
-                raise ParsingError(ParsingError.note)
-        
-        for conn in zeroary:
-            if string == conn:
-                return PropNode(conn, [])
-        
-        if '(' in string:
-            starting_index = string.index('(')
-            p_balance = 1
-            index = starting_index
-            for char in string[starting_index+1:]:
-                index += 1
-
-                if char == '(':
-                    p_balance += 1
-                elif char == ')':
-                    p_balance -= 1
-                
-                if p_balance < 0:
-                    raise ParsingError(ParsingError.note)
-                if p_balance == 0:
-                    break
-                if index == len(string)-1:
-                    raise ParsingError(ParsingError.note)
-            
-            if index == starting_index:
-                raise ParsingError(ParsingError.note)
-            
-            first_conn = string[:starting_index]
-            mid = string[starting_index:index+1]
-            conn_rest = string[index+1:]
-
-            output = PropNode.parse(mid[1:-1])
-            
-            if len(first_conn) > 0:
-                unary_conn = None
-                for conn in unary:
-                    if first_conn == conn:
-                        unary_conn = conn
-                        output = PropNode(unary_conn, [output])
-                conn_before = None
-                first = None
-                for conn in binary:
-                    if len(first_conn) > len(conn) and first_conn[-len(conn):] == conn:
-                        conn_before = first_conn[-len(conn):]
-                        first = first_conn[:-len(conn)]
-                        output = PropNode(conn_before, [PropNode.parse(first), output])
-                        break
-                if unary_conn == None and conn_before == None:
-                    raise ParsingError(ParsingError.note)
-
-            if len(conn_rest) > 0:
-                conn_after = None
-                rest = None
-                for conn in binary:
-                    if len(conn_rest) > len(conn) and conn_rest[:len(conn)] == conn:
-                        conn_after = conn_rest[:len(conn)]
-                        rest = conn_rest[len(conn):]
-                        output = PropNode(conn_after, [output, PropNode.parse(rest)])
-                        break
-                if conn_after == None:
-                    raise ParsingError(ParsingError.note)
-            
-            return output
-
-        for conn in binary:
-            if len(string)>1 and (conn in string):
-                idx = string.index(conn)
-                first = string[:idx]
-                main_conn = string[idx:idx+len(conn)]
-                rest = string[idx+len(conn):]
-
-                if len(first) == 0 or len(rest)==0:
-                    raise ParsingError(ParsingError.note)
-
-                return PropNode(main_conn, [PropNode.parse(first), PropNode.parse(rest)])
-        
-        for conn in unary:
-            if len(string) > len(conn) and string[:len(conn)] == conn:
-                return PropNode(conn, [PropNode.parse(string[len(conn):])])
-
-        raise ParsingError(ParsingError.note)
\ No newline at end of file
+                segment.append(token)
+
+    def parse_before(string, segment, group, position):
+        """
+        The parenthesized formula group, at position, with the tokens of segment right before it
+        """
+        i = len(segment)
+        while i > 0 and segment[i-1][0] == 'unary':
+            i -= 1
+            group = PropNode(segment[i][1], [group])
+        if i == 0:
+            return group
+        kind, conn, _ = segment[i-1]
+        if kind != 'binary':
+            raise ParsingError.at(string, position)
+        return PropNode(conn, [PropNode.parse_plain(string, segment[:i-1], segment[i-1]), group])
+
+    def parse_plain(string, tokens, stop):
+        """
+        The formula of tokens, which hold no parentheses; stop is the token right after them
+        """
+        operands = []
+        operators = []
+
+        def reduce():
+            kind, conn, _ = operators.pop()
+            if kind == 'unary':
+                operands.append(PropNode(conn, [operands.pop()]))
+            else:
+                right = operands.pop()
+                left = operands.pop()
+                operands.append(PropNode(conn, [left, right]))
+
+        expect_operand = True
+        for token in tokens:
+            kind, value, position = token
+            if expect_operand:
+                if kind == 'atom':
+                    operands.append(PropNode(value, []))
+                    expect_operand = False
+                elif kind == 'unary':
+                    operators.append(token)
+                else:
+                    raise ParsingError.at(string, position)
+            elif kind == 'binary':
+                while len(operators) > 0 and (operators[-1][0] == 'unary' or precedence[operators[-1][1]] > precedence[value]):
+                    reduce()
+                operators.append(token)
+                expect_operand = True
+            else:
+                raise ParsingError.at(string, position)
+        if expect_operand:
+            raise ParsingError.at(string, stop[2])
+        while len(operators) > 0:
+            reduce()
+        return operands[0]
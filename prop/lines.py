@@ -36,10 +36,13 @@ class DeductionLine(ProofLine):
         self.formula = formula
         self.rule = rule
         self.parent_proof = None
+        # the cited lines themselves (or the number, for a citation that can't be resolved), set by the proof
+        self.citations = None
     
     def __repr__(self):
         return f'DeductionLine({self.formula.__repr__()}, {self.rule.__repr__()})'
     
     def change(self, formula, rule):
         self.formula = formula
-        self.rule = rule
\ No newline at end of file
+        self.rule = rule
+        self.citations = None
\ No newline at end of file
@@ -1,5 +1,8 @@
 from prop.lines import *
 from prop.comments import *
+from prop.checkers import *
+import itertools
+from proof_html import proof_html
 
 class ProofError(LogicError):
     pass
@@ -16,9 +19,32 @@ class Proof():
 
         self.parent = None
         self.subproofs = []
+
+        # flat index of lines, kept up to date on the main proof only
+        self._lines = list(self.assumptions)
+        self._line_numbers = {line: i+1 for (i, line) in enumerate(self._lines)}
+        self._scopes = None
+
+        # verdicts of deduction lines from the last check, and the lines citing each line or subproof
+        self._verdicts = {}
+        self._cited_by = {}
+
+        # deduction lines whose citations are still plain numbers, and the lines citing each line
+        self._unbound = set()
+        self._citing = {}
+
+        # LaTeX of lines, of rules with the line numbers they were shown with, and of the formula column of subproofs
+        self._latex_lines = {}
+        self._latex_rules = {}
     
     def n_lines(self):
-        return len(self.pure_list())
+        if self.parent is None:
+            return len(self.index()[0])
+        first, last = self._first_line(), self._last_line()
+        if first is None or last is None:
+            return len(self.pure_list())
+        line_numbers = self.index()[1]
+        return line_numbers[last] - line_numbers[first] + 1
 
     def __str__(self):
         def aux(self, n):
@@ -28,81 +54,158 @@ class Proof():
             output += '    '*n + '-----\n'
             for subproof in self.subproofs:
                 if isinstance(subproof, DeductionLine):
-                    output += ('    '*n + subproof.formula.latex() + ' || ' +  subproof.rule.latex() + '\n') 
+                    output += ('    '*n + subproof.formula.latex() + ' || ' +  self.rule_of(subproof).latex() + '\n') 
                 elif isinstance(subproof, Proof):
                     output += aux(subproof, n+1)
             return output
         return aux(self, 0)
     
     def latex(self):
-        def first(self):
-            output = ''
-            output += r"\begin{array}{l}" + '\n'
-            for i in range(self.n_lines()):
-                output += rf"{i+1} \\" + '\n'
-            output += r"\end{array}"+ '\n'
-            return output
-        
-        def second(self):
-            output = ''
-            output += r"\begin{array}{|l}"+ '\n'
+        """
+        The LaTeX of each line and rule is cached on the main proof until an edit touches it,
+        so rendering again only joins the cached pieces. The cache is per line rather than per subproof:
+        the pages add and remove a blank line at the cursor on every rerun, which would void every
+        subproof around it, the main proof included.
+        """
+        main = self.main_proof()
+        parts = [r"\def\arraystretch{1.5}\begin{array}{l l}" + '\n', r"\begin{array}{l}" + '\n']
+        parts += [rf"{i+1} \\" + '\n' for i in range(self.n_lines())]
+        parts += [r"\end{array}"+ '\n', '\n']
+        self._formulas_latex(main, parts)
+        parts.append('\n' + '&' + '\n')
+        if self.parent == None:
+            parts.append(r'\begin{array}{l}'+ '\n')
+        self._rules_latex(parts)
+        if self.parent == None:
+            parts.append(r'\end{array}'+ '\n')
+        parts.append('\n' + r"\end{array}")
+        return ''.join(parts)
+
+    def _formulas_latex(self, main, parts):
+        parts.append(r"\begin{array}{|l}"+ '\n')
+        for a in self.assumptions:
+            parts.append(main._line_latex(a) + r'\\'+ '\n')
+        if len(self.assumptions) > 0:
+            parts.append(r'\hline'+ '\n')
+        for subproof in self.subproofs:
+            if isinstance(subproof, DeductionLine):
+                parts.append(main._line_latex(subproof))
+            else:
+                subproof._formulas_latex(main, parts)
+            parts.append(r'\\'+ '\n')
+        parts.append(r"\end{array}"+ '\n')
+
+    def _line_latex(self, line):
+        output = self._latex_lines.get(line)
+        if output is None:
+            output = line.formula.latex()
+            self._latex_lines[line] = output
+        return output
 
-            for a in self.assumptions:
-                output += a.formula.latex() + r'\\'+ '\n'
-            if len(self.assumptions) > 0:
-                output += r'\hline'+ '\n'
-            
-            for subproof in self.subproofs:
-                if isinstance(subproof, DeductionLine):
-                    output += subproof.formula.latex()
-                else:
-                    output += second(subproof)
-                output += r'\\'+ '\n'
-            
-            output += r"\end{array}"+ '\n'
-            return output
-        
-        def third(self):
-            output = ''
+    def _rules_latex(self, parts):
+        main = self.main_proof()
+        line_numbers = self.index()[1]
+        for _ in self.assumptions:
+            parts.append(r'\\'+ '\n')
+        for subproof in self.subproofs:
+            if isinstance(subproof, DeductionLine):
+                parts.append(main._rule_latex(subproof, line_numbers) + r'\\'+ '\n')
+            else:
+                subproof._rules_latex(parts)
 
-            if self.parent == None:
-                output += r'\begin{array}{l}'+ '\n'
+    def _rule_latex(self, line, line_numbers):
+        # the rule is shown with the current numbers of the cited lines, which edits elsewhere can shift
+        if line.citations is None:
+            key = line.rule
+        else:
+            key = tuple(cited if isinstance(cited, str) else line_numbers[cited] for cited in line.citations)
+        cached = self._latex_rules.get(line)
+        if cached is None or cached[0] != key:
+            cached = (key, self.rule_of(line).latex())
+            self._latex_rules[line] = cached
+        return cached[1]
+
+    def html(self):
+        """
+        The proof as HTML with one row per line, to show with st.markdown
+        """
+        return proof_html(self)
 
-            for _ in self.assumptions:
-                output += r'\\'+ '\n'
-            
-            for subproof in self.subproofs:
-                if isinstance(subproof, DeductionLine):
-                    output += subproof.rule.latex() + r'\\'+ '\n'
+    def latex_window(self, current, size=40):
+        """
+        The LaTeX of the proof as seen from the subproof current: the lines of current and of the proofs
+        around it, with every other subproof collapsed to one row. Past size rows the earlier ones are left out,
+        so rendering costs as much as the window and not as the whole proof.
+        """
+        main = self.main_proof()
+        line_numbers = self.index()[1]
+        path = []
+        proof = current
+        while proof is not None:
+            path.append(proof)
+            proof = proof.parent
+        path.reverse()
+
+        rows = list(itertools.islice(main._window_rows(path, 0, line_numbers), size+1))
+        rows.reverse()
+        if len(rows) > size:
+            rows[0] = (r'\vdots', main, 0, r'\vdots', '', False)
+
+        numbers, formulas, rules = [], [r"\begin{array}{|l}"+ '\n'], []
+        stack = [main]
+        for (number, scope, depth, formula, rule, hline) in rows:
+            while len(stack) > depth+1 or (len(stack) == depth+1 and stack[-1] is not scope):
+                stack.pop()
+                formulas.append(r"\end{array}"+ '\n' + r'\\'+ '\n')
+            while len(stack) < depth+1:
+                stack.append(scope if len(stack) == depth else path[len(stack)])
+                formulas.append(r"\begin{array}{|l}"+ '\n')
+            numbers.append(number + r" \\" + '\n')
+            formulas.append(formula + r'\\'+ '\n')
+            if hline:
+                formulas.append(r'\hline'+ '\n')
+            rules.append(rule + r'\\'+ '\n')
+        while len(stack) > 1:
+            stack.pop()
+            formulas.append(r"\end{array}"+ '\n' + r'\\'+ '\n')
+        formulas.append(r"\end{array}"+ '\n')
+
+        parts = [r"\def\arraystretch{1.5}\begin{array}{l l}" + '\n', r"\begin{array}{l}" + '\n']
+        parts += numbers
+        parts += [r"\end{array}"+ '\n', '\n']
+        parts += formulas
+        parts += ['\n' + '&' + '\n', r'\begin{array}{l}'+ '\n']
+        parts += rules
+        parts += [r'\end{array}'+ '\n', '\n' + r"\end{array}"]
+        return ''.join(parts)
+
+    def _window_rows(self, path, depth, line_numbers):
+        # the rows of latex_window from the bottom up, so that only the ones shown get built
+        main = path[0]
+        for subproof in reversed(self.subproofs):
+            if isinstance(subproof, DeductionLine):
+                yield (str(line_numbers[subproof]), self, depth, main._line_latex(subproof), main._rule_latex(subproof, line_numbers), False)
+            elif depth+1 < len(path) and path[depth+1] is subproof:
+                yield from subproof._window_rows(path, depth+1, line_numbers)
+            else:
+                first, last = subproof._first_line(), subproof._last_line()
+                if first is None:
+                    continue
+                if first is last:
+                    yield (str(line_numbers[first]), subproof, depth+1, main._line_latex(first), '', False)
                 else:
-                    output += third(subproof)
-            
-            if self.parent == None:
-                output += r'\end{array}'+ '\n'
-            
-            return output
-        
-        return r"\def\arraystretch{1.5}\begin{array}{l l}" + '\n' + first(self) + '\n' + second(self) + '\n' + '&' + '\n' + third(self) + '\n' +  r"\end{array}"
+                    number = str(line_numbers[first]) + r'\text{-}' + str(line_numbers[last])
+                    yield (number, subproof, depth+1, main._line_latex(first) + r' \;\cdots\; ' + main._line_latex(last), '', False)
+        for i in reversed(range(len(self.assumptions))):
+            a = self.assumptions[i]
+            yield (str(line_numbers[a]), self, depth, main._line_latex(a), '', i == len(self.assumptions)-1)
 
     def add_line(self, line_number, formula, rule):
         if not (1 <= line_number <= self.n_lines()):
             raise ProofError("trying to add after invalid line number")
-        for line in self.pure_list()[line_number:]:
-            if isinstance(line, DeductionLine):
-                old_name = line.rule.name
-                old_cit_lines = line.rule.cit_lines
-                new_name = old_name
-                new_cit_lines = []
-                for number in old_cit_lines:
-                    number = int(number)
-                    if number > line_number:
-                        new_cit_lines.append(str(number+1))
-                    else:
-                        new_cit_lines.append(str(number))
-                new_cit_lines = tuple(new_cit_lines)
-                line.rule = Rule(new_name, new_cit_lines)
-
-        relevant_line = self.pure_list()[line_number-1]
+        self.main_proof()._bind()
+
+        relevant_line = self.find(line_number)
         new_line = DeductionLine(formula, rule)
         new_line.parent_proof = relevant_line.parent_proof
         if isinstance(relevant_line, AssumptionLine):
@@ -110,52 +213,88 @@ class Proof():
         elif isinstance(relevant_line, DeductionLine):
             idx = relevant_line.parent_proof.subproofs.index(relevant_line)
             relevant_line.parent_proof.subproofs.insert(idx + 1, new_line)
+        self.main_proof()._splice(line_number, line_number, [new_line], renumbered=True)
 
     def delete_line(self, line_number):
         if not (1 <= line_number <= self.n_lines()):
             raise ProofError("trying to delete invalid line number")
-        
-        relevant_line = self.pure_list()[line_number-1]
+        self.main_proof()._bind()
+
+        relevant_line = self.find(line_number)
 
         number_to_remove = 1
         if isinstance(relevant_line, AssumptionLine) and (relevant_line.parent_proof.parent != None):
             number_to_remove = relevant_line.parent_proof.n_lines()
 
-        for line in self.pure_list()[line_number-1:]:
-            if isinstance(line, DeductionLine):
-                old_name = line.rule.name
-                old_cit_lines = line.rule.cit_lines
-                new_name = old_name
-                new_cit_lines = []
-                for number in old_cit_lines:
-                    number = int(number)
-                    if number > line_number:
-                        new_cit_lines.append(str(number-number_to_remove))
-                    else:
-                        new_cit_lines.append(str(number))
-                new_cit_lines = tuple(new_cit_lines)
-                line.rule = Rule(new_name, new_cit_lines)
-
         if isinstance(relevant_line, AssumptionLine):
             relevant_line.parent_proof.parent.subproofs.remove(relevant_line.parent_proof)
         elif isinstance(relevant_line, DeductionLine):
             relevant_line.parent_proof.subproofs.remove(relevant_line)
+        self.main_proof()._splice(line_number-1, line_number-1+number_to_remove, [], renumbered=True)
         
     def add_last(self, subproof):
         if isinstance(subproof, DeductionLine):
             subproof.parent_proof = self  
+            new_lines = [subproof]
         elif isinstance(subproof, Proof):
+            new_lines = subproof.pure_list()
+            citing = subproof._citing
+            subproof._lines = None
+            subproof._line_numbers = None
+            subproof._scopes = None
             subproof.parent = self
         else:
             raise ProofError('adding object with wrong type to proof')
+        last = self._last_line()
         self.subproofs.append(subproof)
+        main = self.main_proof()
+        if isinstance(subproof, Proof):
+            for (cited, lines) in citing.items():
+                main._citing.setdefault(cited, []).extend(lines)
+        if main._lines is None:
+            return
+        scopes = main._scopes
+        if last is not None:
+            at_end = main._line_numbers[last] == len(main._lines)
+            main._splice(main._line_numbers[last], main._line_numbers[last], new_lines)
+        elif main is self and len(main._lines) == 0:
+            at_end = True
+            main._splice(0, 0, new_lines)
+        else:
+            main._lines = None
+            main._scopes = None
+            main._forget_all()
+            return
+        if scopes is not None and at_end:
+            # only self and the proofs around it grow when lines are appended at the very end
+            proof = self
+            while proof is not None:
+                start, end = scopes[proof]
+                scopes[proof] = (start, end + len(new_lines))
+                proof = proof.parent
+            if isinstance(subproof, Proof):
+                subproof._collect_scopes(len(main._lines) - len(new_lines) + 1, scopes)
+            main._scopes = scopes
 
     def remove_last(self):
         if len(self.subproofs) == 0:
             raise ProofError('trying to remove lines from main proof when there are no lines to remove')
         
         if isinstance(self.subproofs[-1], DeductionLine):
+            line = self.subproofs[-1]
             self.subproofs = self.subproofs[:-1]
+            main = self.main_proof()
+            if main._lines is not None:
+                scopes = main._scopes
+                line_number = main._line_numbers[line]
+                main._splice(line_number-1, line_number, [])
+                if scopes is not None and line_number == len(main._lines) + 1:
+                    proof = self
+                    while proof is not None:
+                        start, end = scopes[proof]
+                        scopes[proof] = (start, end - 1)
+                        proof = proof.parent
+                    main._scopes = scopes
             return self
         else:
             return self.subproofs[-1].remove_last()
@@ -164,7 +303,180 @@ class Proof():
         if self.parent is None:
             raise ProofError('trying to delete main proof')
 
+        # the later lines keep citing the same lines, as when the subproof is deleted by its first line
+        main = self.main_proof()
+        main._bind()
+        first, last = self._first_line(), self._last_line()
         self.parent.subproofs.remove(self)
+        if main._lines is None:
+            return
+        if first is not None and last is not None:
+            main._splice(main._line_numbers[first]-1, main._line_numbers[last], [], renumbered=True)
+        else:
+            main._lines = None
+            main._scopes = None
+            main._forget_all()
+
+    def main_proof(self):
+        proof = self
+        while proof.parent is not None:
+            proof = proof.parent
+        return proof
+
+    def index(self):
+        """
+        Returns the flat list of lines of the whole proof and a map from each line to its line number.
+        Both live on the main proof; they are rebuilt from scratch only if an edit could not update them in place.
+        """
+        main = self.main_proof()
+        if main._lines is None:
+            main._lines = main.pure_list()
+            main._line_numbers = {line: i+1 for (i, line) in enumerate(main._lines)}
+            main._unbound = set(line for line in main._lines if isinstance(line, DeductionLine) and line.citations is None)
+        return main._lines, main._line_numbers
+
+    def _splice(self, start, stop, new_lines, renumbered=False):
+        """
+        Replaces self._lines[start:stop] by new_lines and renumbers the lines after start.
+        Only called on the main proof, after the tree itself has been edited.
+        renumbered says whether the citations of the later lines were shifted along with them.
+        """
+        removed = self._lines[start:stop]
+        orphaned = []
+        for line in removed:
+            orphaned += [(citing, line) for citing in self._citing.pop(line, ())]
+            self._unbound.discard(line)
+            del self._line_numbers[line]
+        self._lines[start:stop] = new_lines
+        self._unbound.update(line for line in new_lines if isinstance(line, DeductionLine))
+        for i in range(start, len(self._lines)):
+            self._line_numbers[self._lines[i]] = i+1
+        self._scopes = None
+
+        # a citation of a removed line goes to the line that now has its number, as a typed number would
+        for (citing, line) in orphaned:
+            if citing not in self._line_numbers or citing.citations is None:
+                continue
+            if start < len(self._lines):
+                new_cited = self._lines[start]
+                self._citing.setdefault(new_cited, []).append(citing)
+            else:
+                new_cited = str(start+1)
+            citing.citations = tuple(new_cited if cited is line else cited for cited in citing.citations)
+
+        self._forget(removed + new_lines)
+        for line in self._lines[start+len(new_lines):]:
+            # shifted citations still point at the same lines, but bad comments quote line numbers,
+            # also those of the earlier lines that cite a shifted line,
+            # and a citation of a number that was not a line stays put while the line moves
+            if not renumbered or isinstance(self._verdicts.get(line), BadComment) or any(isinstance(cited, str) for cited in getattr(line, 'citations', None) or ()):
+                self._verdicts.pop(line, None)
+            for citing in self._cited_by.get(line, ()):
+                if isinstance(self._verdicts.get(citing), BadComment):
+                    del self._verdicts[citing]
+
+    def _bind(self):
+        """
+        Resolves the citations of the lines added since the last call into the cited lines themselves,
+        so that they follow those lines when lines are inserted or deleted before them.
+        Only called on the main proof.
+        """
+        lines, line_numbers = self.index()
+        for line in self._unbound:
+            if line not in line_numbers or line.citations is not None or not isinstance(line.rule, Rule):
+                continue
+            citations = []
+            for number in line.rule.cit_lines:
+                number = str(number)
+                if number.strip().isdigit() and 1 <= int(number) <= len(lines):
+                    cited = lines[int(number)-1]
+                    citations.append(cited)
+                    self._citing.setdefault(cited, []).append(line)
+                    # a verdict checked before the citation was bound quotes the number, which may now shift
+                    self._cited_by.setdefault(cited, set()).add(line)
+                else:
+                    citations.append(number)
+            line.citations = tuple(citations)
+        self._unbound = set()
+
+    def rule_of(self, line):
+        """
+        The rule of a deduction line, with its citations given by the current line numbers.
+        """
+        if line.citations is None:
+            return line.rule
+        line_numbers = self.index()[1]
+        return Rule(line.rule.name, tuple(cited if isinstance(cited, str) else str(line_numbers[cited]) for cited in line.citations))
+
+    def _forget(self, lines):
+        """
+        Drops the cached verdicts of the given lines, of the lines citing them,
+        and of the lines citing a subproof that contains one of them,
+        along with the cached LaTeX of the lines.
+        """
+        main = self.main_proof()
+        for line in lines:
+            main._verdicts.pop(line, None)
+            main._latex_lines.pop(line, None)
+            main._latex_rules.pop(line, None)
+            for citing in main._cited_by.pop(line, ()):
+                main._verdicts.pop(citing, None)
+            proof = line.parent_proof
+            while proof is not None:
+                for citing in main._cited_by.pop(proof, ()):
+                    main._verdicts.pop(citing, None)
+                proof = proof.parent
+
+    def _forget_all(self):
+        self._verdicts = {}
+        self._cited_by = {}
+        self._latex_lines = {}
+        self._latex_rules = {}
+
+    def scopes(self):
+        """
+        Maps every proof in the tree to the interval (first line number, last line number) it spans,
+        so that "line n lies inside proof P" is a constant-time check.
+        """
+        main = self.main_proof()
+        if main._scopes is None:
+            main._scopes = {}
+            main._collect_scopes(1, main._scopes)
+        return main._scopes
+
+    def _collect_scopes(self, start, scopes):
+        n = start + len(self.assumptions)
+        for subproof in self.subproofs:
+            if isinstance(subproof, DeductionLine):
+                n += 1
+            else:
+                n = subproof._collect_scopes(n, scopes)
+        scopes[self] = (start, n-1)
+        return n
+
+    def in_scope(self, line_number, proof):
+        start, end = self.scopes()[proof]
+        return start <= line_number <= end
+
+    def _first_line(self):
+        proof = self
+        while True:
+            if len(proof.assumptions) > 0:
+                return proof.assumptions[0]
+            if len(proof.subproofs) == 0:
+                return None
+            if isinstance(proof.subproofs[0], DeductionLine):
+                return proof.subproofs[0]
+            proof = proof.subproofs[0]
+
+    def _last_line(self):
+        proof = self
+        while True:
+            if len(proof.subproofs) == 0:
+                return proof.assumptions[-1] if len(proof.assumptions) > 0 else None
+            if isinstance(proof.subproofs[-1], DeductionLine):
+                return proof.subproofs[-1]
+            proof = proof.subproofs[-1]
     
     def pure_list(self):
         output = []
@@ -177,25 +489,44 @@ class Proof():
         return output
     
     def find(self, n):
+        if self.parent is not None:
+            if not (1 <= n <= self.n_lines()):
+                raise ProofError('trying to find with out of range line number')
+            lines, line_numbers = self.index()
+            return lines[line_numbers[self.first()] + n - 2]
         try:
-            return self.pure_list()[n-1]
+            return self.index()[0][n-1]
         except IndexError:
             raise ProofError('trying to find with out of range line number')
     
     def find_line_number(self, proofline):
-        return self.pure_list().index(proofline) + 1
+        line_numbers = self.index()[1]
+        if proofline not in line_numbers:
+            raise ProofError('trying to find the line number of a line outside of the proof')
+        if self.parent is None:
+            return line_numbers[proofline]
+        return line_numbers[proofline] - line_numbers[self.first()] + 1
     
     def first(self):
-        return self.pure_list()[0]
+        line = self._first_line()
+        if line is None:
+            return self.pure_list()[0]
+        return line
     
     def last(self):
-        return self.pure_list()[-1]
+        line = self._last_line()
+        if line is None:
+            return self.pure_list()[-1]
+        return line
         
     def change(self, n, formula, rule):
-        if isinstance(self.find(n), DeductionLine):
-            self.find(n).change(formula, rule)
+        line = self.find(n)
+        if isinstance(line, DeductionLine):
+            line.change(formula, rule)
+            self.main_proof()._unbound.add(line)
         else:
-            self.find(n).change(formula)
+            line.change(formula)
+        self._forget([line])
     
     def accessible(self, line_number1, line_number2):
         """
@@ -205,22 +536,71 @@ class Proof():
             return False
         try:
             line1 = self.find(line_number1)
-            line2 = self.find(line_number2)
-            parental_proof2 = line2.parent_proof
+            self.find(line_number2)
         except:
             raise ProofError('trying to assess accessibility for assumption line')
-        while isinstance(parental_proof2, Proof):
-            if line1 in parental_proof2.assumptions+parental_proof2.subproofs:
-                return True
-            parental_proof2 = parental_proof2.parent
-        return False
+        return self.in_scope(line_number2, line1.parent_proof)
     
     def check_line(self, n):
         main_line = self.find(n)
         if isinstance(main_line, AssumptionLine):
             return GoodComment()
-        
-        main_formula, rule_name, cit = main_line.formula, main_line.rule.name, main_line.rule.cit
+        return self._check_deduction(n, main_line, lambda proof: self.in_scope(n, proof))
+
+    def check_all(self):
+        """
+        Checks every line of the whole proof in a single walk and returns the comments in line order.
+        The walk keeps the proofs that are open at the current line, so accessibility is a set lookup.
+        Verdicts are cached on the main proof until an edit touches the line or something it cites.
+        """
+        main = self.main_proof()
+        comments = [GoodComment() for _ in main.assumptions]
+        open_proofs = set([main])
+        stack = [iter(main.subproofs)]
+        parents = [main]
+        while len(stack) > 0:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                open_proofs.discard(parents.pop())
+            elif isinstance(child, DeductionLine):
+                n = len(comments) + 1
+                comment = main._verdicts.get(child)
+                if comment is None:
+                    comment = main._check_deduction(n, child, open_proofs.__contains__)
+                    main._verdicts[child] = comment
+                    for cited in main._cited(n, child):
+                        main._cited_by.setdefault(cited, set()).add(child)
+                comments.append(comment)
+            else:
+                comments += [GoodComment() for _ in child.assumptions]
+                open_proofs.add(child)
+                stack.append(iter(child.subproofs))
+                parents.append(child)
+        return comments
+
+    def _cited(self, n, main_line):
+        """
+        The lines cited by deduction line n, plus the subproof each cited range ends in.
+        Later lines count too: citing one is an error, whose message has its number.
+        """
+        lines = self.index()[0]
+        cited = []
+        for string in self.rule_of(main_line).cit.split(','):
+            numbers = [int(number) for number in string.split('-') if number.strip().isdigit()]
+            cited_lines = [lines[number-1] for number in numbers if 1 <= number <= len(lines)]
+            cited += cited_lines
+            if '-' in string and len(cited_lines) == 2:
+                cited.append(cited_lines[1].parent_proof)
+        return cited
+
+    def _check_deduction(self, n, main_line, is_open):
+        """
+        Checks deduction line n; is_open(proof) tells whether proof is still open at line n.
+        """
+        lines = self.index()[0]
+        rule = self.rule_of(main_line)
+        main_formula, rule_name, cit = main_line.formula, rule.name, rule.cit
         
         cit_split = cit.split(',')
 
@@ -233,9 +613,9 @@ class Proof():
 
         cit_formulas = []
         for line_number in cit_line_numbers:
-            if not self.accessible(line_number, n):
+            if not (1 <= line_number < n and is_open(lines[line_number-1].parent_proof)):
                     return BadComment(f'Line {line_number} is not accessible at this line.')
-            line = self.find(line_number)
+            line = lines[line_number-1]
             cit_formulas.append(line.formula)
 
         #Deal with formula ranges
@@ -249,222 +629,39 @@ class Proof():
                 if line_number1 >= n or line_number2 >= n:
                     return BadComment(f'The range {line_number1}-{line_number2} does not come strictly before the line on which it is cited.')
 
-                line1 = self.find(line_number1)
-                line2 = self.find(line_number2)
+                line1 = lines[line_number1-1]
+                line2 = lines[line_number2-1]
                 if not (isinstance(line1, AssumptionLine) and isinstance(line2, DeductionLine)):
                     return BadComment(f'The range {line_number1}-{line_number2} does not encompass a subproof.')
                 
                 subproof = line2.parent_proof
 
-                main_proof = subproof
-                while isinstance(main_proof.parent, Proof):
-                    main_proof = main_proof.parent
-
                 if not (len(subproof.assumptions) == 1 and line1 == subproof.assumptions[0]): 
                     return BadComment(f'The range {line_number1}-{line_number2} does not encompass a subproof.')
                 
                 if subproof.parent == None:
                     return BadComment(f'The range {line_number1}-{line_number2} does not encompass a subproof.')
                 
-                if subproof.n_lines() != (line_number2-line_number1+1):
+                if self.scopes()[subproof] != (line_number1, line_number2):
                     return BadComment(f'The range {line_number1}-{line_number2} does not encompass a subproof.')
 
-                if not (subproof.parent.parent == None or self.accessible(main_proof.find_line_number(subproof.parent.first()), n)):
+                if not (subproof.parent.parent == None or is_open(subproof.parent)):
                     return BadComment(f'The subproof {line_number1}-{line_number2} is not accessible at this line.')
                 
                 if subproof in cit_subproofs:
                     return BadComment("The same subproof is being cited twice.")
 
                 cit_subproofs.append(subproof)
-        
-        #Logic of each individual rule
-
-        if rule_name == r'R':
-            if main_formula.eq_syntax(cit_formulas[0]):
-                return GoodComment()
-            else:
-                return BadComment('The reiterated formula is different than the cited formula.')
-        
-        elif rule_name == r'\wedge E':
-            cit_formula = cit_formulas[0]
-            if not cit_formula.name == r'\wedge':
-                return BadComment('The cited formula is not a conjunction.')
-            
-            if not (main_formula.eq_syntax(cit_formula.sub[0]) or main_formula.eq_syntax(cit_formula.sub[1])):
-                return BadComment('The deduced formula is different than both conjuncts of the cited formula.')
-            
-            return GoodComment()
-        
-        elif rule_name == r'\wedge I':
-            if not main_formula.name == r'\wedge':
-                return BadComment('The deduced formula is not a conjunction.')
-            
-            if not (main_formula.eq_syntax(PropNode(r'\wedge',[cit_formulas[0], cit_formulas[1]])) or main_formula.eq_syntax(PropNode(r'\wedge',[cit_formulas[1], cit_formulas[0]]))):
-                return BadComment('The deduced formula is not the conjunction of the two cited formulas.')
-            
-            return GoodComment()
-        
-        elif rule_name == r'\to E':
-            impl_formulas = []
-            for cit_formula in cit_formulas:
-                if cit_formula.name == r'\to':
-                    impl_formulas.append(cit_formula)
-            
-            if len(impl_formulas)==0:
-                return BadComment('Neither cited formula is an implication.')
-            
-            final_impl_formula = None
-            final_ant_formula = None
-
-            for impl_formula in impl_formulas:
-                ant_formula = [form for form in cit_formulas if form!=impl_formula][0]
-                if impl_formula.sub[0].eq_syntax(ant_formula):
-                    final_impl_formula = impl_formula
-                    final_ant_formula = ant_formula
-            
-            if final_impl_formula is None:
-                return BadComment('Neither cited formula is the antecedent of the other.')
-                
-            if final_impl_formula.sub[1].eq_syntax(main_formula):
-                return GoodComment()
-            else:
-                return BadComment('The deduced formula is not the consequent of the relevant cited formula.')
-        
-        elif rule_name == r'\to I':
-            if not main_formula.name == r'\to':
-                return BadComment('The deduced formula is not an implication.')
-            elif not main_formula.sub[0].eq_syntax(cit_subproofs[0].first().formula):
-                return BadComment("The antecedent of the deduced formula is not the assumption of the cited subproof.")
-            elif not main_formula.sub[1].eq_syntax(cit_subproofs[0].last().formula):
-                return BadComment("The consequent of the deduced formula is not the last line of the cited subproof.")
-            else:
-                return GoodComment()
-        
-        elif rule_name == r'\leftrightarrow I':
-            if not main_formula.name == r'\leftrightarrow':
-                return BadComment('The deduced formula is not a biconditional.')
-            elif not (cit_subproofs[0].last().formula.eq_syntax(cit_subproofs[1].first().formula)):
-                return BadComment('The second subproof does not begin with the last line of the first subproof.')
-            elif not (cit_subproofs[1].last().formula.eq_syntax(cit_subproofs[0].first().formula)):
-                return BadComment('The second subproof does not end with the first line of the first subproof.')
-            elif not ((cit_subproofs[0].first().formula.eq_syntax(main_formula.sub[0]) and cit_subproofs[0].last().formula.eq_syntax(main_formula.sub[1])) or (cit_subproofs[0].first().formula.eq_syntax(main_formula.sub[1]) and cit_subproofs[0].last().formula.eq_syntax(main_formula.sub[0]))):
-                return BadComment('The subproofs do not begin and end with the conditionals of the deduced line.')
-            else:
-                return GoodComment()
-        
-        elif rule_name == r'\leftrightarrow E':
-            bicond_formulas = []
-            for cit_formula in cit_formulas:
-                if cit_formula.name == r'\leftrightarrow':
-                    bicond_formulas.append(cit_formula)
-            
-            if len(bicond_formulas) == 0:
-                return BadComment('Neither cited formula is a biconditional.')
-
-            final_bicond_formula = None
-            final_other_formula = None
-            for bicond_formula in bicond_formulas:
-                other_formula = [formula for formula in cit_formulas if formula != bicond_formula][0]
-                if bicond_formula.sub[0].eq_syntax(other_formula) or bicond_formula.sub[1].eq_syntax(other_formula):
-                    final_bicond_formula = bicond_formula
-                    final_other_formula = other_formula
-            
-            if not isinstance(final_bicond_formula, PropNode):
-                return BadComment('The cited biconditional does not have the other cited formula as either of its conditionals.')
-            
-            if not ((final_bicond_formula.sub[0].eq_syntax(final_other_formula) and final_bicond_formula.sub[1].eq_syntax(main_formula))or(final_bicond_formula.sub[1].eq_syntax(final_other_formula) and final_bicond_formula.sub[0].eq_syntax(main_formula))):
-                return 'The cited biconditional does not have as one conditional the cited line and as the other conditional the deduced line.'
-            
-            return GoodComment()
-        
-        elif rule_name == r'\neg E':
-            cit_formula = cit_formulas[0]
-            if not cit_formula.name == r'\neg':
-                return BadComment('The cited formula is not a negation.')
-            
-            if not main_formula.name == r'\to':
-                return BadComment('The deduced formula is not an implication.')
-            
-            if not (main_formula.sub[0].eq_syntax(cit_formula.sub[0])):
-                return BadComment('The unnegated version of the cited formula is not the antecedent of the deduced formula.')
-            
-            return GoodComment()
-        
-        elif rule_name == r'EFQ':
-            cit_formula = cit_formulas[0]
-            if not (cit_formula.name == r'\wedge' and (cit_formula.sub[0].eq_syntax(PropNode(r'\neg',[cit_formula.sub[1]])) or cit_formula.sub[1].eq_syntax(PropNode(r'\neg',[cit_formula.sub[0]])))):
-                return BadComment('The cited formula is not the conjunction of a formula and its negation.')
-            
-            return GoodComment()
-        
-        elif rule_name == r'\bot E':
-            cit_formula = cit_formulas[0]
-            if not (cit_formula.name == r'\bot'):
-                return BadComment('The cited formula is not bottom.')
-            
-            return GoodComment()
-        
-        elif rule_name == r'\bot I':
-            if not (main_formula.name == r'\bot'):
-                return BadComment('The deduced formula is not bottom.')
-            
-            if not (cit_formulas[0].eq_syntax(PropNode(r'\neg',[cit_formulas[1]])) or cit_formulas[1].eq_syntax(PropNode(r'\neg',[cit_formulas[0]]))):
-                return BadComment('Neither cited formula is the negation of the other.')
 
-            return GoodComment()
-        
-        elif rule_name == r'\neg I':
-            cit_subproof = cit_subproofs[0]
+        return self._check_rule(main_formula, rule_name, cit_formulas, cit_subproofs)
 
-            if not (main_formula.eq_syntax(PropNode(r'\neg', [cit_subproof.first().formula]))):
-                return BadComment("The deduced formula is not the negation of cited subproof's assumption.")
-            
-            if not(cit_subproof.last().formula.eq_syntax(PropNode(r'\bot', [])) or (cit_subproof.last().formula.name == r'\wedge' and (cit_subproof.last().formula.sub[0].eq_syntax(PropNode(r'\neg',[cit_subproof.last().formula.sub[1]])) or cit_subproof.last().formula.sub[1].eq_syntax(PropNode(r'\neg',[cit_subproof.last().formula.sub[0]]))))):
-                return BadComment('The last formula of the cited subproof is not bottom or the conjunction of a formula and its negation.')
-            
-            return GoodComment()
-        
-        elif rule_name == r'RAA':
-            cit_subproof = cit_subproofs[0]
-
-            if not (cit_subproof.first().formula.eq_syntax(PropNode(r'\neg', [main_formula]))):
-                return BadComment("The cited subproof's assumption is not the negation of deduced formula.")
-            
-            if not(cit_subproof.last().formula.eq_syntax(PropNode(r'\bot', [])) or (cit_subproof.last().formula.name == r'\wedge' and (cit_subproof.last().formula.sub[0].eq_syntax(PropNode(r'\neg',[cit_subproof.last().formula.sub[1]])) or cit_subproof.last().formula.sub[1].eq_syntax(PropNode(r'\neg',[cit_subproof.last().formula.sub[0]]))))):
-                return BadComment('The last formula of the cited subproof is not bottom or the conjunction of a formula and its negation.')
-            
-            return GoodComment()
-        
-        elif rule_name == r'\vee I':
-            cit_formula = cit_formulas[0]
-
-            if not (main_formula.name == r'\vee'):
-                return BadComment('The deduced formula is not a disjunction.')
-
-            if main_formula.sub[0].eq_syntax(cit_formula) or main_formula.sub[1].eq_syntax(cit_formula):
-                return GoodComment()
-            else:
-                return BadComment('The cited formula is different than both disjuncts of the deduced formula.')
-            
-        elif rule_name == r'\vee E':
-            cit_formula = cit_formulas[0]
-
-            if not (cit_formula.name == r'\vee'):
-                return BadComment('The cited formula is not a disjunction.')
-
-            if not ((cit_formula.sub[0].eq_syntax(cit_subproofs[0].first().formula) and cit_formula.sub[1].eq_syntax(cit_subproofs[1].first().formula)) or (cit_formula.sub[0].eq_syntax(cit_subproofs[1].first().formula) and cit_formula.sub[1].eq_syntax(cit_subproofs[0].first().formula))):
-                return BadComment('The assumptions of the two cited subproofs are not the same as the disjuncts of the cited disjunction.')
-
-            if not (cit_subproofs[0].last().formula.eq_syntax(cit_subproofs[1].last().formula)):
-                return BadComment('The last line of the two cited subproofs are not the same.')
-            
-            if not (cit_subproofs[0].last().formula.eq_syntax(main_formula)):
-                return BadComment('The deduced formula is not the same as the last line of the two cited subproofs.')
-            
-            return GoodComment()
+    def _check_rule(self, main_formula, rule_name, cit_formulas, cit_subproofs):
+        checker = checkers.get(rule_name)
+        if checker is not None:
+            return checker(main_formula, cit_formulas, cit_subproofs)
 
         if rule_name in rules:
-            raise ProofError('rule not covered by check_line method, fix by editing Proof.check_line')
+            raise ProofError(f'rule {rule_name} has no checker, fix by adding one to prop.checkers')
         
         raise ProofError('ILLEGAL RULE ALLOWED THROUGH PARSING FUNCTION!!!!!')
 
@@ -1,4 +1,5 @@
 from prop.symbols import *
+from prop.rulesets import *
 
 rules = {
     r'\wedge E': '%s',
@@ -18,6 +19,13 @@ rules = {
     r'R': '%s',
 }
 
+# the rules of every rule set, built once when the app starts; rules holds the ones in use
+builtin_rules = dict(rules)
+rule_book = RuleBook(builtin_rules, rulesets, ruleset_name)
+rules = rule_book.rules
+use_rules = rule_book.use
+compile_rules = rule_book.compile
+
 class RuleError(LogicError):
     pass
 
@@ -44,68 +52,23 @@ class Rule():
         return f'Rule({self.name}, {self.cit})'
     
     def parse(string):
-        original = string
-        string = string.replace(' ', '')
-        string = string.replace(r'\land', r'\wedge')
-        string = string.replace(r'\lor', r'\vee')
-        name = None
-        for rule_name in rules:
-            rule_name_no_space = rule_name.replace(' ', '')
-            if string[:len(rule_name_no_space)] == rule_name_no_space:
-                string = string[len(rule_name_no_space):]
-                name = rule_name
-                break
+        string = string.replace(' ', '').replace(r'\land', r'\wedge').replace(r'\lor', r'\vee')
+        name, string = rule_book.parser.name(string)
         if name == None:
             raise RuleError("We couldn't parse this rule name.")
-        
-        if len(string) > 0 and string[0] == ',': string = string[1:]
-
-        original_format = string
-
-        citation_error_message = f"""We couldn't parse the line citation "{original_format}". As a reminder, the line citation for ${name}$ should be of the form {rules[name]%(('#',)*rules[name].count('%s'))} where # is a line number."""
 
-        original_format2 = string
-        original_format3 = string
-
-        overall_check = string
-        for i in range(10):
-            overall_check = overall_check.replace(str(i), '')
-        overall_check = overall_check.replace(',', '').replace('-', '')
-
-        if len(overall_check) > 0:
-            raise CitationError(citation_error_message)
+        if len(string) > 0 and string[0] == ',': string = string[1:]
 
-        format = rules[name].replace(' ', '').replace('%s', '')  
-        for i in range(10):
-            string = string.replace(str(i), '')
+        citation = rule_book.parser.citations[name]
+        match = None if citation is None else citation.fullmatch(string)
+        if match is None:
+            raise CitationError(f"""We couldn't parse the line citation "{string}". As a reminder, the line citation for ${name}$ should be of the form {rules[name]%(('#',)*rules[name].count('%s'))} where # is a line number.""")
 
-        if len(format) != len(string):
-            raise CitationError(citation_error_message) 
-        for format_char, string_char in zip(format, string):
-            if format_char=='_':
-                continue
-            if format_char != string_char:
-                raise CitationError(citation_error_message)
-        
-        number_pieces_string = original_format2.replace('-',',').split(',')
-        number_pieces_format = rules[name].replace(' ', '').replace('-',',').split(',')
-        if len(number_pieces_string)!=len(number_pieces_format):
-            raise CitationError(citation_error_message)
-        for piece in number_pieces_string:
-            if len(piece) == 0:
-                raise CitationError(citation_error_message)
-            
-        commas_sep_list = original_format3.replace(' ', '').split(',')
-        already_seen = []
-        for el in commas_sep_list:
-            if '-' in el:
-                continue
-            if el in already_seen:
-                raise CitationError('You cannot cite the same line twice.')
-            else:
-                already_seen.append(el)
+        cit_lines = match.groups()
+        singles = [cit_lines[group] for group in rule_book.parser.singles[name]]
+        if len(set(singles)) != len(singles):
+            raise CitationError('You cannot cite the same line twice.')
 
-        format_tuple = tuple(original_format.replace('-', ',').split(','))
-        return Rule(name, format_tuple)
+        return Rule(name, cit_lines)
     
 
@@ -0,0 +1,8 @@
+from prop.schemas import *
+import os
+
+# see rulebook.py for the format of the file
+rulesets, default_ruleset = load_rulesets(rulesets_file, 'prop')
+ruleset_name = os.environ.get('FITCH_PROP_RULESET', default_ruleset)
+if ruleset_name not in rulesets:
+    raise RulesetError(f'there is no propositional rule set {ruleset_name} in {rulesets_file}')
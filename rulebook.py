@@ -0,0 +1,347 @@
+from itertools import permutations
+import json
+import os
+import re
+
+# What the rules of both logics have in common: the schema language, rule sets, and the parser of rule names
+# and citations. Schemas only speak of connectives, which both logics write alike.
+__all__ = ['SchemaError', 'Schema', 'RulesetError', 'rulesets_file', 'Ruleset', 'load_rulesets', 'RuleParser', 'RuleBook']
+
+# the connectives of schemas, as both logics write them
+zeroary = [
+    r'\bot'
+]
+
+unary = [
+    r'\neg'
+]
+
+binary = [
+    r'\wedge',
+    r'\vee',
+    r'\to',
+    r'\leftrightarrow',
+]
+
+# as in formulas, a binary connective binds more tightly the later it comes in binary
+precedence = {conn: i for (i, conn) in enumerate(binary)}
+aliases = {
+    r'\rightarrow': r'\to',
+    r'\land': r'\wedge',
+    r'\lor': r'\vee',
+}
+
+class SchemaError(Exception):
+    pass
+
+# A schema describes a rule by the shape of its cited lines and of the deduced formula, e.g.
+#     cite A \to B, cite A; conclude B
+# Capital letters stand for any formula (the same one wherever the letter repeats),
+# cite [A ... B] cites a subproof that starts with A and ends with B,
+# and alternatives are separated by |. Cited formulas (and cited subproofs) may come in any order.
+# Patterns group as formulas do: \neg binds most tightly, then \leftrightarrow, \to, \vee and \wedge,
+# and a connective repeated without parentheses groups to the right, so A \wedge B \to C is A \wedge (B \to C).
+
+def compile_pattern(tokens, i, loosest=0):
+    """
+    Compiles the pattern starting at tokens[i] into a function match(formula, bindings),
+    which binds the capital letters of the pattern in the dict bindings.
+    Only binary connectives at least as tight as binary[loosest] are taken outside of parentheses.
+    Returns the function and the index of the first token after the pattern.
+    """
+    left, i = compile_operand(tokens, i)
+    while i < len(tokens) and tokens[i] in binary and precedence[tokens[i]] >= loosest:
+        conn = tokens[i]
+        # a connective repeated without parentheses groups to the right
+        right, i = compile_pattern(tokens, i+1, precedence[conn])
+        left = compile_node(conn, [left, right])
+    return left, i
+
+def compile_operand(tokens, i):
+    if i >= len(tokens):
+        raise SchemaError('a pattern ends too early')
+    token = tokens[i]
+    if token == '(':
+        match, i = compile_pattern(tokens, i+1)
+        if i >= len(tokens) or tokens[i] != ')':
+            raise SchemaError('unbalanced parentheses in a pattern')
+        return match, i+1
+    if token in unary:
+        sub, i = compile_operand(tokens, i+1)
+        return compile_node(token, [sub]), i
+    if token in zeroary:
+        return compile_node(token, []), i+1
+    if token.isalpha() and token.isupper():
+        return compile_variable(token), i+1
+    raise SchemaError(f'unexpected "{token}" in a pattern')
+
+def compile_node(name, subs):
+    def match(formula, bindings):
+        if formula.name != name or len(formula.sub) != len(subs):
+            return False
+        for (sub, sub_formula) in zip(subs, formula.sub):
+            if not sub(sub_formula, bindings):
+                return False
+        return True
+    return match
+
+def compile_variable(letter):
+    def match(formula, bindings):
+        bound = bindings.get(letter)
+        if bound is None:
+            bindings[letter] = formula
+            return True
+        return bound.eq_syntax(formula)
+    return match
+
+def tokenize_schema(text):
+    for symbol in ['(', ')', '[', ']', ',', ';', '|']:
+        text = text.replace(symbol, f' {symbol} ')
+    return [aliases.get(token, token) for token in text.split()]
+
+def whole_pattern(tokens):
+    match, i = compile_pattern(tokens, 0)
+    if i != len(tokens):
+        raise SchemaError(f'unexpected "{tokens[i]}" in a pattern')
+    return match
+
+class Alternative():
+    """
+    One alternative of a schema: the cited lines in order, then the deduced formula.
+    """
+    def __init__(self, tokens):
+        if ';' not in tokens:
+            raise SchemaError('a schema needs "; conclude ..." after its citations')
+        split = tokens.index(';')
+        cites, conclusion = tokens[:split], tokens[split+1:]
+
+        if len(conclusion) == 0 or conclusion[0] != 'conclude':
+            raise SchemaError('a schema needs "; conclude ..." after its citations')
+        self.conclusion = whole_pattern(conclusion[1:])
+
+        self.shape = []
+        self.formulas = []
+        self.subproofs = []
+        while len(cites) > 0:
+            if ',' in cites:
+                cite, cites = cites[:cites.index(',')], cites[cites.index(',')+1:]
+            else:
+                cite, cites = cites, []
+            if len(cite) == 0 or cite[0] != 'cite':
+                raise SchemaError('each citation of a schema starts with "cite"')
+            if len(cite) > 1 and cite[1] == '[':
+                if cite[-1] != ']' or '...' not in cite:
+                    raise SchemaError('a cited subproof is written [A ... B]')
+                dots = cite.index('...')
+                self.subproofs.append((whole_pattern(cite[2:dots]), whole_pattern(cite[dots+1:-1])))
+                self.shape.append('subproof')
+            else:
+                self.formulas.append(whole_pattern(cite[1:]))
+                self.shape.append('formula')
+
+    def match(self, main_formula, cit_formulas, cit_subproofs):
+        if len(cit_formulas) != len(self.formulas) or len(cit_subproofs) != len(self.subproofs):
+            return False
+        for formulas in permutations(cit_formulas):
+            for subproofs in permutations(cit_subproofs):
+                bindings = {}
+                formulas_left, subproofs_left = iter(zip(self.formulas, formulas)), iter(zip(self.subproofs, subproofs))
+                matched = True
+                for kind in self.shape:
+                    if kind == 'formula':
+                        (pattern, formula) = next(formulas_left)
+                        matched = pattern(formula, bindings)
+                    else:
+                        ((first, last), subproof) = next(subproofs_left)
+                        assumption = getattr(subproof.first(), 'formula', None)
+                        matched = assumption is not None and first(assumption, bindings) and last(subproof.last().formula, bindings)
+                    if not matched:
+                        break
+                if matched and self.conclusion(main_formula, bindings):
+                    return True
+        return False
+
+class Schema():
+    """
+    A rule written in the schema language above, compiled once into matching functions.
+    """
+    def __init__(self, text):
+        self.text = text
+        tokens = tokenize_schema(text)
+        self.alternatives = []
+        while len(tokens) > 0:
+            if '|' in tokens:
+                alternative, tokens = tokens[:tokens.index('|')], tokens[tokens.index('|')+1:]
+            else:
+                alternative, tokens = tokens, []
+            self.alternatives.append(Alternative(alternative))
+        if len(self.alternatives) == 0:
+            raise SchemaError('empty schema')
+
+        shapes = set(tuple(alternative.shape) for alternative in self.alternatives)
+        if len(shapes) > 1:
+            raise SchemaError('all alternatives of a schema must cite the same kinds of lines')
+        # the citation format of the rule, as in the rules dict
+        self.citations = ', '.join('%s' if kind == 'formula' else '%s-%s' for kind in self.alternatives[0].shape)
+
+    def match(self, main_formula, cit_formulas, cit_subproofs):
+        for alternative in self.alternatives:
+            if alternative.match(main_formula, cit_formulas, cit_subproofs):
+                return True
+        return False
+
+    def __repr__(self):
+        return f'Schema({self.text})'
+
+class RulesetError(Exception):
+    pass
+
+# Rule sets are read once, when the app starts, from a JSON file with an entry for each logic, like
+#     {"prop": {"default": "standard",
+#               "rulesets": {"standard": {},
+#                            "no EFQ": {"drop": ["EFQ"]},
+#                            "derived": {"add": {"MT": "cite A \\to B, cite \\neg B; conclude \\neg A"}}}},
+#      "pred": {"default": "standard", "rulesets": {"standard": {}}}}
+# where "drop" removes built-in rules and "add" defines new rules by their schemas.
+# The rule set is a setting of the whole server process, shared by every session:
+# FITCH_RULESETS points to another file, and FITCH_PROP_RULESET and FITCH_PRED_RULESET pick rule sets other than the defaults.
+rulesets_file = os.environ.get('FITCH_RULESETS', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rulesets.json'))
+
+class Ruleset():
+    def __init__(self, name, entry):
+        self.name = name
+        if not isinstance(entry, dict) or not set(entry) <= {'drop', 'add'}:
+            raise RulesetError(f'rule set {name} should only have the entries "drop" and "add"')
+
+        drop = entry.get('drop', [])
+        if not isinstance(drop, list) or not all(isinstance(rule_name, str) for rule_name in drop):
+            raise RulesetError(f'"drop" of rule set {name} should be a list of rule names')
+        self.drop = set(drop)
+
+        add = entry.get('add', {})
+        if not isinstance(add, dict) or not all(isinstance(text, str) for text in add.values()):
+            raise RulesetError(f'"add" of rule set {name} should map rule names to schemas')
+        self.add = {}
+        for (rule_name, text) in add.items():
+            if rule_name.strip() == '':
+                raise RulesetError(f'rule set {name} adds a rule without a name')
+            try:
+                self.add[rule_name] = Schema(text)
+            except SchemaError as e:
+                raise RulesetError(f'rule {rule_name} of rule set {name}: {e}')
+
+    def table(self, builtin, make):
+        """
+        Returns builtin (a dict from rule names to anything) without the dropped rules
+        and with the added ones, built by make(name, schema)
+        """
+        for rule_name in self.drop:
+            if rule_name not in builtin:
+                raise RulesetError(f'rule set {self.name} drops {rule_name}, which is not a rule')
+        for rule_name in self.add:
+            if rule_name in builtin and rule_name not in self.drop:
+                raise RulesetError(f'rule set {self.name} adds {rule_name}, which is already a rule')
+        table = {rule_name: value for (rule_name, value) in builtin.items() if rule_name not in self.drop}
+        for (rule_name, schema) in self.add.items():
+            table[rule_name] = make(rule_name, schema)
+        return table
+
+    def __repr__(self):
+        return f'Ruleset({self.name})'
+
+def load_rulesets(path, logic):
+    """
+    Returns the rule sets for logic ('prop' or 'pred') in the file at path, and the name of the default one.
+    Without a file, or without an entry for logic, the only rule set is the standard one.
+    """
+    standard = {'standard': Ruleset('standard', {})}, 'standard'
+    if not os.path.exists(path):
+        return standard
+    try:
+        with open(path) as file:
+            config = json.load(file)
+    except (OSError, ValueError) as e:
+        raise RulesetError(f"can't read the rule sets in {path}: {e}")
+
+    if not isinstance(config, dict) or not set(config) <= {'prop', 'pred'}:
+        raise RulesetError(f'{path} should only have the entries "prop" and "pred"')
+    if logic not in config:
+        return standard
+    config = config[logic]
+    if not isinstance(config, dict) or not isinstance(config.get('rulesets'), dict) or len(config['rulesets']) == 0:
+        raise RulesetError(f'"{logic}" in {path} should have a nonempty "rulesets" entry')
+    loaded = {name: Ruleset(name, entry) for (name, entry) in config['rulesets'].items()}
+    default = config.get('default', next(iter(loaded)))
+    if default not in loaded:
+        raise RulesetError(f'the default rule set {default} is not in "{logic}" in {path}')
+    return loaded, default
+
+class RuleParser():
+    """
+    The rule names of a rule table in a trie, with a regular expression for the citation of each rule
+    """
+    def __init__(self, table):
+        self.trie = {}
+        for name in table:
+            node = self.trie
+            for char in name.replace(' ', ''):
+                node = node.setdefault(char, {})
+            node.setdefault(None, name)
+
+        self.citations = {}
+        self.singles = {}
+        for (name, citation) in table.items():
+            citation = citation.replace(' ', '')
+            if '%s' in citation:
+                self.citations[name] = re.compile('([0-9]+)'.join(re.escape(piece) for piece in citation.split('%s')))
+            else:
+                self.citations[name] = None
+            # the groups of the lines cited on their own, rather than as the end of a range
+            singles = []
+            group = 0
+            for piece in citation.split(','):
+                if piece == '%s':
+                    singles.append(group)
+                group += piece.count('%s')
+            self.singles[name] = singles
+
+    def name(self, string):
+        """
+        Returns the longest rule name at the start of string (or None) and the rest of string
+        """
+        node = self.trie
+        name, end = None, 0
+        for (i, char) in enumerate(string):
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node:
+                name, end = node[None], i+1
+        return name, string[end:]
+
+class RuleBook():
+    """
+    The citation format of every rule in each rule set of a logic, with the rules in use and their parser.
+    rules is only ever changed in place, so a logic can keep it as its module-level rules dict.
+    """
+    # counts the changes of rules in any rule book, so that parsed rules can be cached until the next one
+    version = 0
+
+    def __init__(self, builtin, rulesets, name):
+        self.tables = {ruleset_name: ruleset.table(builtin, lambda rule_name, schema: schema.citations) for (ruleset_name, ruleset) in rulesets.items()}
+        self.parsers = {ruleset_name: RuleParser(table) for (ruleset_name, table) in self.tables.items()}
+        self.rules = {}
+        self.use(name)
+
+    def use(self, name):
+        self.rules.clear()
+        self.rules.update(self.tables[name])
+        self.parser = self.parsers[name]
+        RuleBook.version += 1
+
+    def compile(self):
+        """
+        Rebuilds the parser of rules, after rules was changed by hand
+        """
+        self.parser = RuleParser(self.rules)
+        RuleBook.version += 1
@@ -0,0 +1,45 @@
+import pytest
+import prop.checkers
+import pred.checkers
+import prop.proofs
+import pred.proofs
+
+modules = [(prop.checkers, prop.proofs, prop.proofs.PropNode.parse, prop.proofs.AssumptionLine),
+           (pred.checkers, pred.proofs, pred.proofs.Pred_Form.parse, pred.proofs.NormalAssumptionLine)]
+
+def test_every_rule_has_a_checker():
+    for (C, P, parse, assumption) in modules:
+        for (name, table) in C.rule_book.tables.items():
+            assert set(table) == set(C.checker_tables[name])
+        assert set(C.rules) == set(C.checkers)
+        assert all(checker.name == name for (name, checker) in C.checkers.items())
+        assert C.BOT is parse(r'\bot')
+
+def test_lines_are_checked_by_the_checker_of_their_rule():
+    for (C, P, parse, assumption) in modules:
+        formula = parse(r'\bot')
+        main = P.Proof([assumption(formula)])
+        main.add_last(P.DeductionLine(formula, P.Rule.parse('R 1')))
+        calls = []
+        def check(main_formula, cit_formulas, cit_subproofs):
+            calls.append((main_formula, cit_formulas, cit_subproofs))
+            return P.BadComment('checked by hand')
+        try:
+            C.checkers['R'] = C.Checker('R', check)
+            assert main.check_line(2).text == 'checked by hand'
+            assert calls == [(formula, [formula], [])]
+            del C.checkers['R']
+            with pytest.raises(P.ProofError):
+                main.check_line(2)
+        finally:
+            C.use_ruleset(C.ruleset_name)
+        assert isinstance(main.check_line(2), P.GoodComment)
+
+def test_biconditional_elimination_to_the_wrong_formula_is_bad():
+    for (C, P, parse, assumption) in modules:
+        p, q = parse(r'\bot'), parse(r'\neg \bot')
+        main = P.Proof([assumption(parse(r'\bot \leftrightarrow \neg \bot')), assumption(p)])
+        main.add_last(P.DeductionLine(p, P.Rule.parse(r'\leftrightarrow E 1, 2')))
+        main.add_last(P.DeductionLine(q, P.Rule.parse(r'\leftrightarrow E 1, 2')))
+        assert isinstance(main.check_line(3), P.BadComment)
+        assert isinstance(main.check_line(4), P.GoodComment)
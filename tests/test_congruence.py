@@ -0,0 +1,46 @@
+from pred.proofs import *
+
+F = Pred_Form.parse
+
+def chain(n):
+    return [F(f'c_{i} = c_{i+1}') for i in range(n)]
+
+def test_chained_identities():
+    congruence = Congruence(chain(12))
+    assert congruence.holds(F('c_0 = c_12'))
+    assert congruence.holds(F('c_12 = c_3'))
+    assert congruence.equal(F('P(f(c_0), c_5)'), F('P(f(c_12), c_1)'))
+    assert not congruence.holds(F('c_0 = c_13'))
+    assert not congruence.equal(F('P(c_0)'), F('Q(c_12)'))
+
+def test_congruence_merges_function_terms():
+    congruence = Congruence(chain(10) + [F('f(c_10) = c')])
+    assert congruence.holds(F('f(f(c_0)) = f(c)'))
+    assert congruence.equals(Pred_Term.parse('c')) == frozenset([Pred_Term.parse('c'), Pred_Term.parse('f(c_10)'), Pred_Term.parse('f(c_0)')])
+
+def chained_proof(n, missing=None):
+    identities = [identity for (i, identity) in enumerate(chain(n)) if i != missing]
+    main = Proof([NormalAssumptionLine(formula) for formula in identities + [F('P(c_0)')]])
+    main.add_last(DeductionLine(F(f'P(c_{n})'), Rule.parse(f'= E 1, {n+1}')))
+    return main
+
+def test_identity_hint_for_a_chain_cited_at_once():
+    main = chained_proof(10)
+    assert isinstance(main.check_line(12), BadComment)
+    assert 'line 11' in main.identity_hint(12)
+
+    main.add_last(DeductionLine(F('c_0 = c_10'), Rule.parse('= E 1, 2')))
+    assert 'identity does follow' in main.identity_hint(13)
+
+def test_no_identity_hint_when_the_chain_breaks():
+    main = chained_proof(11, missing=4)
+    assert main.identity_hint(12) is None
+    assert main.identity_hint(2) is None
+
+def test_identities_in_closed_subproofs_do_not_count():
+    main = Proof([NormalAssumptionLine(F('P(c_0)'))])
+    subproof = Proof([NormalAssumptionLine(F('c_0 = c_1'))])
+    main.add_last(subproof)
+    subproof.add_last(DeductionLine(F('c_0 = c_1'), Rule.parse('R 2')))
+    main.add_last(DeductionLine(F('P(c_1)'), Rule.parse('= E 1, 2')))
+    assert main.identity_hint(4) is None
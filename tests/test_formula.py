@@ -0,0 +1,379 @@
+import pickle
+import random
+import threading
+import pytest
+from prop.formula import PropNode, ParsingError, LogicError
+import pred.formula
+
+def grouped(string):
+    return PropNode.parse(string).latex()
+
+def test_spaces_are_ignored():
+    assert grouped(r'\n eg p') == r'\neg p'
+    assert grouped(r'p \rig htarrow q') == r'(p \to q)'
+    assert grouped(' ( p\t\\wedge  q ) ') == r'(p \wedge q)'
+
+def test_error_position_counts_the_spaces():
+    with pytest.raises(ParsingError) as err:
+        PropNode.parse('p  \\wedge  P')
+    assert err.value.position == 11
+
+def test_error_at_builds_the_calling_class():
+    class RuleParsingError(ParsingError):
+        pass
+    assert type(RuleParsingError.at('p \\wedge', 8)) is RuleParsingError
+
+def test_grouping_without_parentheses():
+    assert grouped(r'r \vee p \to r \vee r') == r'(r \vee ((p \to r) \vee r))'
+    assert grouped(r'p \wedge q \to r') == r'(p \wedge (q \to r))'
+    assert grouped(r'p \to q \wedge r') == r'((p \to q) \wedge r)'
+    assert grouped(r'p \to q \to r') == r'(p \to (q \to r))'
+    assert grouped(r'p \leftrightarrow q \to r') == r'((p \leftrightarrow q) \to r)'
+    assert grouped(r'\neg p \vee q') == r'(\neg p \vee q)'
+
+def test_grouping_around_parentheses():
+    # as the parser before the precedence parser read them
+    assert grouped(r'r \lor p \rightarrow (r \vee r)') == r'((r \vee p) \to (r \vee r))'
+    assert grouped(r'(r \vee p) \to r \vee r') == r'((r \vee p) \to (r \vee r))'
+    assert grouped(r'(p \to q) \wedge r \vee s') == r'((p \to q) \wedge (r \vee s))'
+    assert grouped(r'p \leftrightarrow q \wedge (r)') == r'((p \leftrightarrow q) \wedge r)'
+    assert grouped(r'p \wedge q \leftrightarrow (r) \vee s') == r'(((p \wedge q) \leftrightarrow r) \vee s)'
+    assert grouped(r'\neg (p) \to q \wedge r') == r'(\neg p \to (q \wedge r))'
+    assert grouped(r'p \to (q) \to (r)') == r'((p \to q) \to r)'
+    assert grouped(r'p \vee (q \wedge (r \to s \leftrightarrow p)) \to q') == r'((p \vee (q \wedge (r \to (s \leftrightarrow p)))) \to q)'
+
+def test_negation_right_before_parentheses():
+    assert grouped(r'p \wedge \neg (q \vee r)') == r'(p \wedge \neg (q \vee r))'
+    assert grouped(r'\neg \neg (q) \to r') == r'(\neg \neg q \to r)'
+    with pytest.raises(ParsingError) as err:
+        PropNode.parse(r'p \neg (q)')
+    assert err.value.position == 7
+
+def pred_grouped(string):
+    return pred.formula.Pred_Form.parse(string).latex()
+
+def test_pred_spaces_are_ignored():
+    assert pred_grouped(r'\for all x P(x)') == r'\forall x P(x)'
+    assert pred_grouped(r'P(c_ 1)') == r'P(c_{1})'
+    assert pred_grouped(r'\n eg c = d') == r'\neg (c = d)'
+    assert pred.formula.Pred_Term.parse(' f( c_1 , y )').latex() == pred.formula.Pred_Term.parse('f(c_1,y)').latex()
+
+def test_pred_error_position_counts_the_spaces():
+    with pytest.raises(pred.formula.ParsingError) as err:
+        pred_grouped('P(c_ )')
+    assert err.value.position == 2
+
+def test_pred_grouping():
+    assert pred_grouped(r'\forall x P(x) \to Q(x)') == r'(\forall x P(x) \to Q(x))'
+    assert pred.formula.Pred_Form.parse(r'\forall x P(x) \to Q(x)').value == r'\to'
+    assert pred_grouped(r'P(c) \vee Q(c) \to (R(c) \vee R(c))') == r'(P(c) \vee (Q(c) \to (R(c) \vee R(c))))'
+    assert pred_grouped(r'P(c) \wedge Q(c) \to R(c)') == r'(P(c) \wedge (Q(c) \to R(c)))'
+
+def test_pred_quantifier_over_the_constant_c():
+    # vacuous, as the c in the scope is still the constant, but accepted as it always was
+    formula = pred.formula.Pred_Form.parse(r'\forall c (P(c) \to Q(x))')
+    assert formula.latex() == r'\forall c (P(c) \to Q(x))'
+    assert formula.var == 'c'
+    assert formula.free() == frozenset(['x'])
+    assert formula.consts() == frozenset(['c'])
+    with pytest.raises(pred.formula.ParsingError) as err:
+        pred.formula.Pred_Form.parse(r'\exists c_1 P(c_1)')
+    assert err.value.position == 8
+
+def replaced(unsubbed, subbed, t1, t2):
+    return pred.formula.substitute_compare_TT(pred.formula.Pred_Form.parse(unsubbed), pred.formula.Pred_Form.parse(subbed), pred.formula.Pred_Term.parse(t1), pred.formula.Pred_Term.parse(t2))
+
+def test_identity_replaces_any_number_of_occurrences():
+    assert replaced('Q(c, c)', 'Q(c, c)', 'c', 'c_1')
+    assert replaced('Q(c, c)', 'Q(c_1, c)', 'c', 'c_1')
+    assert replaced('Q(c, c)', 'Q(c, c_1)', 'c', 'c_1')
+    assert replaced('Q(c, c)', 'Q(c_1, c_1)', 'c', 'c_1')
+    assert replaced(r'P(f(c)) \wedge Q(c, c)', r'P(f(c_1)) \wedge Q(c, c_1)', 'c', 'c_1')
+    assert not replaced('Q(c, c)', 'Q(c_2, c)', 'c', 'c_1')
+    assert not replaced('Q(c, c)', 'Q(c_1, c)', 'c_1', 'c')
+
+def test_identity_replaces_whole_terms():
+    assert replaced('P(f(c))', 'P(c_1)', 'f(c)', 'c_1')
+    assert replaced('P(g(f(c), c))', 'P(g(c_1, c))', 'f(c)', 'c_1')
+    assert not replaced('P(f(c))', 'P(f(c_1))', 'f(c)', 'c_1')
+
+def test_identity_replacement_is_not_captured():
+    # x in t2 would be bound by the quantifier
+    assert not replaced(r'\forall x Q(c, x)', r'\forall x Q(x, x)', 'c', 'x')
+    assert replaced('Q(c, x)', 'Q(x, x)', 'c', 'x')
+    # y in t1 is bound there, so that f(y) is not the term of the identity
+    assert not replaced(r'\exists y P(f(y))', r'\exists y P(c)', 'f(y)', 'c')
+    assert replaced(r'P(f(y)) \wedge \exists y P(f(y))', r'P(c) \wedge \exists y P(f(y))', 'f(y)', 'c')
+    assert not replaced(r'P(f(y)) \wedge \exists y P(f(y))', r'P(c) \wedge \exists y P(c)', 'f(y)', 'c')
+
+def test_identity_replacement_under_other_quantifiers():
+    assert replaced(r'\forall x P(c)', r'\forall x P(c_1)', 'c', 'c_1')
+    assert replaced(r'\forall x (P(c) \to Q(x, c))', r'\forall x (P(c_1) \to Q(x, c))', 'c', 'c_1')
+    assert not replaced(r'\forall x P(c)', r'\exists x P(c_1)', 'c', 'c_1')
+
+def test_eq_elim_verdicts():
+    from pred.checkers import eq_elim, BadComment, GoodComment
+    F = pred.formula.Pred_Form.parse
+    assert isinstance(eq_elim(F('Q(c_1, c)'), [F('c = c_1'), F('Q(c, c)')], []), GoodComment)
+    assert isinstance(eq_elim(F('Q(c_1, c)'), [F('Q(c, c)'), F('c_1 = c')], []), GoodComment)
+    assert isinstance(eq_elim(F(r'\forall x Q(x, x)'), [F('c = x'), F(r'\forall x Q(c, x)')], []), BadComment)
+    assert isinstance(eq_elim(F(r'\exists y P(c)'), [F('f(y) = c'), F(r'\exists y P(f(y))')], []), BadComment)
+    # y can't become x under \exists x, and x is not free in the cited formula to become y
+    assert eq_elim(F(r'P(x) \wedge \exists x Q(x, y)'), [F('y = x'), F(r'P(y) \wedge \exists x Q(x, y)')], []).text == 'the relevant term is not substitutable in the cited formula.'
+    assert eq_elim(F('P(x)'), [F('y = x'), F('Q(c)')], []).text == 'not all variables in the substituted term are free in the cited formula.'
+
+def witness(unsubbed, subbed, var_name):
+    term = pred.formula.match_instance(pred.formula.Pred_Form.parse(unsubbed), pred.formula.Pred_Form.parse(subbed), var_name)
+    return None if term is None else term.latex()
+
+def mismatch(unsubbed, subbed, var_name):
+    with pytest.raises(pred.formula.MatchError) as err:
+        pred.formula.match_instance(pred.formula.Pred_Form.parse(unsubbed), pred.formula.Pred_Form.parse(subbed), var_name)
+    return str(err.value), err.value.path
+
+def test_match_instance_finds_the_witness():
+    assert witness(r'P(x) \wedge Q(x, c)', r'P(f(c)) \wedge Q(f(c), c)', 'x') == 'f(c)'
+    assert witness(r'\exists y Q(x, y)', r'\exists y Q(z, y)', 'x') == 'z'
+    assert witness('P(x)', 'P(x)', 'x') == 'x'
+
+def test_match_instance_substitutes_every_occurrence():
+    assert mismatch('Q(x, x)', 'Q(c, c_1)', 'x') == ('different terms are substituted for x.', (1,))
+    # an occurrence left as it was is a second witness, x itself
+    assert mismatch('Q(x, x)', 'Q(c, x)', 'x') == ('different terms are substituted for x.', (1,))
+    assert mismatch(r'P(x) \to Q(f(x), c)', r'P(c) \to Q(f(c_1), c)', 'x') == ('different terms are substituted for x.', (1, 0, 0))
+    # the c already there is left alone
+    assert witness('Q(x, c)', 'Q(c, c)', 'x') == 'c'
+    assert mismatch('Q(x, c)', 'Q(c_1, c_1)', 'x') == ('the terms differ.', (1,))
+
+def test_match_instance_of_a_vacuous_quantification():
+    assert witness('P(c)', 'P(c)', 'x') is None
+    assert mismatch('P(c)', 'P(c_1)', 'x') == ('the formulas differ.', ())
+
+def test_match_instance_is_not_captured():
+    assert mismatch(r'\exists y Q(x, y)', r'\exists y Q(y, y)', 'x') == ('the term substituted for x would be bound by a quantifier.', (0, 0))
+    assert mismatch(r'\exists y Q(x, y)', r'\exists y Q(f(y), y)', 'x') == ('the term substituted for x would be bound by a quantifier.', (0, 0))
+    # x is not free under \forall x, so it stays
+    assert witness(r'P(x) \wedge \forall x P(x)', r'P(c) \wedge \forall x P(x)', 'x') == 'c'
+    assert mismatch(r'P(x) \wedge \forall x P(x)', r'P(c) \wedge \forall x P(c)', 'x') == ('the formulas differ.', (1,))
+
+def test_quantifier_rule_verdicts():
+    from pred.checkers import forall_elim, exists_intro, BadComment, GoodComment
+    F = pred.formula.Pred_Form.parse
+    assert isinstance(forall_elim(F('Q(f(c), f(c))'), [F(r'\forall x Q(x, x)')], []), GoodComment)
+    assert isinstance(forall_elim(F('Q(c, x)'), [F(r'\forall x Q(x, x)')], []), BadComment)
+    assert isinstance(forall_elim(F(r'\exists y Q(y, y)'), [F(r'\forall x \exists y Q(x, y)')], []), BadComment)
+    assert isinstance(forall_elim(F('P(c)'), [F(r'\forall x P(c)')], []), GoodComment)
+    assert isinstance(forall_elim(F('P(c_1)'), [F(r'\forall x P(c)')], []), BadComment)
+    assert isinstance(exists_intro(F(r'\exists x Q(x, c)'), [F('Q(c, c)')], []), GoodComment)
+    assert isinstance(exists_intro(F(r'\exists x Q(x, x)'), [F('Q(c, c_1)')], []), BadComment)
+    assert isinstance(exists_intro(F(r'\exists x \forall y Q(x, y)'), [F(r'\forall y Q(y, y)')], []), BadComment)
+
+def alpha_eq(formula1, formula2):
+    return pred.formula.Pred_Form.parse(formula1).alpha_eq(pred.formula.Pred_Form.parse(formula2))
+
+def test_alpha_equivalent_formulas():
+    assert alpha_eq(r'\forall x P(x)', r'\forall y P(y)')
+    assert alpha_eq(r'\forall x \exists y Q(x, y)', r'\forall y \exists x Q(y, x)')
+    assert alpha_eq(r'\forall x P(c)', r'\forall y P(c)')
+    assert not alpha_eq(r'\forall x \exists y Q(x, y)', r'\forall x \exists y Q(y, x)')
+    assert not alpha_eq(r'\forall x P(x)', r'\exists y P(y)')
+
+def test_alpha_equivalence_with_shadowing():
+    # the inner quantifier binds the x of Q
+    assert alpha_eq(r'\forall x (P(x) \wedge \exists x Q(x, x))', r'\forall y (P(y) \wedge \exists z Q(z, z))')
+    assert not alpha_eq(r'\forall x (P(x) \wedge \exists x Q(x, x))', r'\forall y (P(y) \wedge \exists z Q(y, z))')
+    assert alpha_eq(r'\forall x \forall x P(x)', r'\forall y \forall z P(z)')
+    assert not alpha_eq(r'\forall x \forall x P(x)', r'\forall y \forall z P(y)')
+
+def test_alpha_equivalence_keeps_free_variables():
+    assert alpha_eq(r'\forall x Q(x, y)', r'\forall z Q(z, y)')
+    assert not alpha_eq(r'\forall x Q(x, y)', r'\forall y Q(y, y)')
+    assert not alpha_eq('P(x)', 'P(y)')
+    assert alpha_eq(r'P(x) \wedge \forall x P(x)', r'P(x) \wedge \forall y P(y)')
+    assert not alpha_eq(r'P(x) \wedge \forall x P(x)', r'P(y) \wedge \forall y P(y)')
+
+def test_rules_compare_up_to_bound_variables():
+    from pred.checkers import reiteration, and_intro, to_elim, BadComment, GoodComment
+    F = pred.formula.Pred_Form.parse
+    assert isinstance(reiteration(F(r'\forall y P(y)'), [F(r'\forall x P(x)')], []), GoodComment)
+    assert isinstance(reiteration(F(r'\forall y Q(y, x)'), [F(r'\forall x Q(x, x)')], []), BadComment)
+    assert isinstance(and_intro(F(r'\exists y P(y) \wedge P(c)'), [F('P(c)'), F(r'\exists x P(x)')], []), GoodComment)
+    assert isinstance(to_elim(F(r'\forall z Q(z)'), [F(r'\forall x P(x) \to \forall y Q(y)'), F(r'\forall y P(y)')], []), GoodComment)
+
+def test_equal_prop_formulas_are_the_same_node():
+    formula = PropNode.parse(r'(p \wedge q) \to \neg r')
+    assert PropNode.parse(r'( p\land q )\rightarrow\neg r') is formula
+    built = PropNode(r'\to', [PropNode(r'\wedge', [PropNode('p', []), PropNode('q', [])]), PropNode(r'\neg', [PropNode('r', [])])])
+    assert built is formula and built.eq_syntax(formula)
+    assert PropNode.parse(r'(p \wedge q) \to r') is not formula
+    assert pickle.loads(pickle.dumps(formula)) is formula
+
+def test_prop_nodes_are_interned_across_threads():
+    nodes = []
+    threads = [threading.Thread(target=lambda: nodes.append(PropNode.parse(r'p \vee q \vee s'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(node is nodes[0] for node in nodes)
+
+def test_prop_nodes_are_immutable():
+    formula = PropNode.parse(r'p \wedge q')
+    for (attr, value) in [('name', r'\vee'), ('sub', ()), ('_latex', 'p')]:
+        with pytest.raises(LogicError):
+            setattr(formula, attr, value)
+    assert formula.name == r'\wedge' and isinstance(formula.sub, tuple)
+    assert formula.latex() == r'(p \wedge q)'
+    with pytest.raises(LogicError):
+        formula.eq_syntax(r'p \wedge q')
+
+def test_equal_pred_formulas_are_the_same_object():
+    F = pred.formula.Pred_Form.parse
+    formula = F(r'\forall x (P(x, f(c)) \to x = c_1)')
+    assert F(r'\all x(P(x,f(c))\rightarrow x=c_1)') is formula
+    assert F(r'\forall y (P(y, f(c)) \to y = c_1)') is not formula
+    assert formula.sub[0].sub[0].sub[1] is pred.formula.Pred_Term.parse('f(c)')
+    assert pickle.loads(pickle.dumps(formula)) is formula
+    assert pickle.loads(pickle.dumps(pred.formula.Pred_Term.parse('f(x, c)'))) is pred.formula.Pred_Term.parse('f(x, c)')
+
+def test_pred_formulas_and_terms_are_immutable():
+    formula = pred.formula.Pred_Form.parse(r'\exists x P(x)')
+    term = pred.formula.Pred_Term.parse('f(c)')
+    for (obj, attr, value) in [(formula, 'value', r'\forall x.'), (formula, 'var', 'y'), (formula, '_free', frozenset()), (term, 'value', 'g'), (term, 'sub', ())]:
+        with pytest.raises(pred.formula.LogicError):
+            setattr(obj, attr, value)
+    assert (formula.quantifier, formula.var) == (r'\exists', 'x')
+    assert isinstance(formula.sub, tuple) and isinstance(term.sub, tuple)
+
+def random_term(rng, depth):
+    if depth == 0 or rng.random() < 0.5:
+        return rng.choice(['x', 'y', 'z', 'c', 'c_1', 'c_2'])
+    return f'f({random_term(rng, depth-1)}, {random_term(rng, depth-1)})'
+
+def random_formula(rng, depth):
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice([f'P({random_term(rng, 2)})', f'{random_term(rng, 2)} = {random_term(rng, 2)}', r'\bot'])
+    kind = rng.choice([r'\forall', r'\exists', r'\neg', r'\wedge', r'\vee', r'\to', r'\leftrightarrow'])
+    if kind in [r'\forall', r'\exists']:
+        return f'{kind} {rng.choice("xyz")} {random_formula(rng, depth-1)}'
+    if kind == r'\neg':
+        return f'{kind} {random_formula(rng, depth-1)}'
+    return f'({random_formula(rng, depth-1)} {kind} {random_formula(rng, depth-1)})'
+
+def free_and_consts(tree, bound):
+    """
+    The free variables and the constants of tree, found again by walking it
+    """
+    if isinstance(tree, pred.formula.Pred_Term):
+        if tree.ctgy == 'var':
+            return ({tree.value} - bound, set())
+        if tree.ctgy == 'const':
+            return (set(), {tree.value})
+    elif tree.ctgy == 'quant':
+        return free_and_consts(tree.sub[0], bound | {tree.var})
+    free, consts = set(), set()
+    for sub in tree.sub:
+        sub_free, sub_consts = free_and_consts(sub, bound)
+        free, consts = free | sub_free, consts | sub_consts
+    return (free, consts)
+
+def test_cached_free_variables_and_constants():
+    rng = random.Random(5)
+    for _ in range(300):
+        formula = pred.formula.Pred_Form.parse(random_formula(rng, 4))
+        # twice, so that the second answer comes from the cache
+        for _ in range(2):
+            assert (formula.free(), formula.consts()) == free_and_consts(formula, set())
+            assert isinstance(formula.free(), frozenset) and isinstance(formula.consts(), frozenset)
+        # the same subformula is free or bound depending on where it is, but caches what it has on its own
+        for sub in formula.sub:
+            assert (sub.free(), sub.consts()) == free_and_consts(sub, set())
+
+def substituted(tree, var, term):
+    """
+    tree with the free occurrences of var replaced by term, or None if a quantifier would capture them;
+    found without the caches
+    """
+    if isinstance(tree, pred.formula.Pred_Term):
+        if tree.ctgy == 'var':
+            return term if tree.value == var else tree
+        if tree.ctgy == 'const':
+            return tree
+        subs = [substituted(sub, var, term) for sub in tree.sub]
+        return pred.formula.Pred_Term(tree.ctgy, tree.value, subs)
+    if tree.ctgy == 'quant':
+        if tree.var == var:
+            return tree
+        sub = substituted(tree.sub[0], var, term)
+        if sub is None:
+            return None
+        if sub is not tree.sub[0] and tree.var in free_and_consts(term, set())[0]:
+            return None
+        return pred.formula.Pred_Form(tree.ctgy, tree.value, [sub])
+    subs = [substituted(sub, var, term) for sub in tree.sub]
+    if any(sub is None for sub in subs):
+        return None
+    return pred.formula.Pred_Form(tree.ctgy, tree.value, subs)
+
+def test_substitution_against_a_plain_walk():
+    rng = random.Random(17)
+    for _ in range(500):
+        formula = pred.formula.Pred_Form.parse(random_formula(rng, 4))
+        var, term = rng.choice('xyz'), pred.formula.Pred_Term.parse(random_term(rng, 2))
+        expected = substituted(formula, var, term)
+        # twice, so that the second answer comes from the memo
+        for _ in range(2):
+            if expected is None:
+                with pytest.raises(pred.formula.SubstitutionError):
+                    pred.formula.substitute_form(formula, var, term)
+            else:
+                assert pred.formula.substitute_form(formula, var, term) is expected
+
+def test_substitution_is_not_confused_by_names():
+    F, T = pred.formula.Pred_Form.parse, pred.formula.Pred_Term.parse
+    # the variables a and y are letters of "var" and "identity", which once counted as occurrences
+    formula = F(r'\forall x (P(x) \wedge x = c)')
+    assert pred.formula.substitute_form(formula, 'a', T('x')) is formula
+    assert pred.formula.substitute_form(formula, 'y', T('x')) is formula
+    assert pred.formula.substitute_form(F(r'P(y) \wedge \forall x Q(x, y)'), 'y', T('c')) is F(r'P(c) \wedge \forall x Q(x, c)')
+    with pytest.raises(pred.formula.SubstitutionError):
+        pred.formula.substitute_form(F(r'P(y) \wedge \forall x Q(x, y)'), 'y', T('f(x)'))
+
+def written(tree):
+    """
+    The LaTeX of a prop or pred formula or term, as latex() wrote it before it was memoized
+    """
+    if isinstance(tree, PropNode) or tree.ctgy == 'conn':
+        if len(tree.sub) == 0:
+            return tree.name
+        if len(tree.sub) == 1:
+            return f'{tree.name} {written(tree.sub[0])}'
+        return f'({written(tree.sub[0])} {tree.name} {written(tree.sub[1])})'
+    if tree.ctgy == 'quant':
+        return f'{tree.value[:-1]} {written(tree.sub[0])}'
+    if tree.ctgy == 'identity':
+        return f'({written(tree.sub[0])} = {written(tree.sub[1])})'
+    if tree.ctgy in ['pred', 'func']:
+        return f'{tree.value}(' + ','.join(written(sub) for sub in tree.sub) + ')'
+    return tree.value
+
+def random_prop_formula(rng, depth):
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(['p', 'q', 'r', r'\bot'])
+    kind = rng.choice([r'\neg', r'\wedge', r'\vee', r'\to', r'\leftrightarrow'])
+    if kind == r'\neg':
+        return f'{kind} {random_prop_formula(rng, depth-1)}'
+    return f'({random_prop_formula(rng, depth-1)} {kind} {random_prop_formula(rng, depth-1)})'
+
+def test_memoized_latex():
+    rng = random.Random(22)
+    for _ in range(300):
+        prop_formula = PropNode.parse(random_prop_formula(rng, 5))
+        for formula in [prop_formula, pred.formula.Pred_Form.parse(random_formula(rng, 4))]:
+            latex = formula.latex()
+            assert latex == written(formula)
+            assert formula.latex() is latex
+            # the LaTeX of a subformula is shared by the formulas that contain it
+            assert all(sub.latex() in latex for sub in formula.sub)
+        # constants come out as c_{1}, which is not how formulas are typed, so only prop formulas are read back
+        assert PropNode.parse(prop_formula.latex()) is prop_formula
@@ -0,0 +1,127 @@
+import collections
+import itertools
+import random
+import prop.proofs
+import pred.proofs
+
+packages = [(prop.proofs, prop.proofs.PropNode.parse, prop.proofs.AssumptionLine, ['p', 'q', r'p \wedge q', r'p \to q', r'\neg p']),
+            (pred.proofs, pred.proofs.Pred_Form.parse, pred.proofs.NormalAssumptionLine, ['P(c)', 'Q(c)', r'\forall x P(x)', r'P(c) \to Q(c)', 'c = c_1'])]
+
+def edited_proofs(P, parse, assumption, texts, seed):
+    """
+    Edits a proof at random, the way the pages do, and yields it after each edit
+    """
+    rng = random.Random(seed)
+    def formula():
+        return parse(rng.choice(texts))
+    def rule(n):
+        return P.Rule.parse(f'R {rng.randint(1, max(n, 1))}')
+    for _ in range(20):
+        main = P.Proof([assumption(formula()) for _ in range(rng.randint(1, 2))])
+        current = main
+        for _ in range(40):
+            n, op = main.n_lines(), rng.random()
+            first_deduction = len(main.assumptions) + 1
+            if op < 0.35:
+                current.add_last(P.DeductionLine(formula(), rule(n)))
+            elif op < 0.45:
+                subproof = P.Proof([assumption(formula())])
+                current.add_last(subproof)
+                current = subproof
+            elif op < 0.55:
+                current = current.parent or current
+            elif op < 0.65 and n >= first_deduction:
+                k = rng.randint(first_deduction, n)
+                main.add_line(k, formula(), rule(k))
+            elif op < 0.75 and n >= first_deduction:
+                line = main.find(rng.randint(first_deduction, n))
+                proof = current
+                while proof is not None and proof is not line.parent_proof:
+                    proof = proof.parent
+                # the lines of the current proof and of the proofs around it are not deleted from under it
+                if proof is None or isinstance(line, P.DeductionLine):
+                    main.delete_line(main.find_line_number(line))
+            elif op < 0.85 and n >= first_deduction:
+                k = rng.randint(first_deduction, n)
+                if isinstance(main.find(k), P.DeductionLine):
+                    main.change(k, formula(), rule(k))
+            elif op < 0.92:
+                try:
+                    current = current.remove_last()
+                except P.ProofError:
+                    # the last subproof has only its assumption left
+                    pass
+            elif current.parent is not None:
+                subproof, current = current, current.parent
+                subproof.self_delete()
+            yield main
+
+def subproofs(proof):
+    yield proof
+    for subproof in proof.subproofs:
+        if isinstance(subproof, type(proof)):
+            yield from subproofs(subproof)
+
+def test_line_index_follows_the_edits():
+    for (P, parse, assumption, texts) in packages:
+        for main in edited_proofs(P, parse, assumption, texts, 6):
+            lines, line_numbers = main.index()
+            assert lines == main.pure_list()
+            assert line_numbers == {line: i+1 for (i, line) in enumerate(lines)}
+            for proof in subproofs(main):
+                proof_lines = proof.pure_list()
+                assert proof.n_lines() == len(proof_lines)
+                assert (proof.first(), proof.last()) == (proof_lines[0], proof_lines[-1])
+                for (k, line) in enumerate(proof_lines):
+                    assert proof.find(k+1) is line
+                    assert proof.find_line_number(line) == k+1
+
+def accessible_by_walking(main, line_number1, line_number2):
+    """
+    Accessibility found by walking up from the later line, as before the scopes were kept
+    """
+    if line_number1 >= line_number2:
+        return False
+    line1, proof = main.find(line_number1), main.find(line_number2).parent_proof
+    while proof is not None:
+        if line1 in proof.assumptions + proof.subproofs:
+            return True
+        proof = proof.parent
+    return False
+
+def test_scopes_follow_the_edits():
+    for (P, parse, assumption, texts) in packages:
+        for main in edited_proofs(P, parse, assumption, texts, 7):
+            line_numbers = main.index()[1]
+            scopes = main.scopes()
+            assert set(scopes) == set(subproofs(main))
+            for proof in subproofs(main):
+                assert scopes[proof] == (line_numbers[proof.first()], line_numbers[proof.last()])
+                for n in range(1, main.n_lines()+1):
+                    assert main.in_scope(n, proof) == (main.find(n) in proof.pure_list())
+            for n2 in range(1, main.n_lines()+1):
+                for n1 in range(1, main.n_lines()+1):
+                    assert main.accessible(n1, n2) == accessible_by_walking(main, n1, n2)
+
+def test_constant_counts_follow_the_edits():
+    texts = ['P(c)', 'Q(c_1)', r'\forall x R(x, c_2)', r'P(c) \to Q(c_2)', 'c = c_1', r'\bot']
+    made = itertools.count()
+    def assumption(formula):
+        # every fourth assumption opens a \forall I subproof for the constant c_3
+        if next(made) % 4 == 3:
+            return pred.proofs.UnivIntroAssumptionLine('c_{3}')
+        return pred.proofs.NormalAssumptionLine(formula)
+    for main in edited_proofs(pred.proofs, pred.proofs.Pred_Form.parse, assumption, texts, 20):
+        for proof in subproofs(main):
+            counts = collections.Counter()
+            for line in proof.pure_list():
+                counts.update(line.consts())
+            assert proof._const_counts == counts
+            assert proof.consts() == frozenset(counts)
+            outside = set()
+            for line in main.pure_list():
+                if line not in proof.pure_list():
+                    outside |= line.consts()
+            for const_name in ['c', 'c_{1}', 'c_{2}', 'c_{3}', 'c_{4}']:
+                assert proof.has_const(const_name) == (const_name in counts)
+                assert proof.has_const_outside(const_name) == (const_name in outside)
@@ -0,0 +1,98 @@
+import prop.proofs as P
+
+def test_scratch_line_keeps_the_cached_lines():
+    main = P.Proof([P.AssumptionLine(P.PropNode.parse('p'))])
+    sub = P.Proof([P.AssumptionLine(P.PropNode.parse('q'))])
+    main.add_last(sub)
+    sub.add_last(P.DeductionLine(P.PropNode.parse('p'), P.Rule.parse('R 1')))
+    before = main.latex()
+    cached = dict(main._latex_lines)
+
+    # what the pages do on every rerun
+    sub.add_last(P.DeductionLine(P.Blank(), P.Blank()))
+    with_blank = main.latex()
+    sub.remove_last()
+
+    assert with_blank != before
+    assert all(main._latex_lines.get(line) is text for (line, text) in cached.items())
+    assert main.latex() == before
+
+import re
+import pred.proofs
+
+def html_rows(html):
+    """
+    The number, the count of scope bars and the formula of each row
+    """
+    return [(int(number), len(bars) // len('<span class="fitch-bar"></span>'), formula) for (number, bars, formula) in
+            re.findall(r'<span class="fitch-num">(\d+)</span>((?:<span class="fitch-bar"></span>)*)<span class="fitch-formula[^"]*">([^<]*)</span>', html)]
+
+def test_html_has_a_row_per_line_with_its_scope_bars():
+    F = P.PropNode.parse
+    main = P.Proof([P.AssumptionLine(F('p')), P.AssumptionLine(F('q'))])
+    outer = P.Proof([P.AssumptionLine(F('r'))])
+    main.add_last(outer)
+    inner = P.Proof([P.AssumptionLine(F('q'))])
+    outer.add_last(inner)
+    inner.add_last(P.DeductionLine(F('r'), P.Rule.parse('R 3')))
+    outer.add_last(P.DeductionLine(F(r'q \to r'), P.Rule.parse(r'\to I 4-5')))
+    main.add_last(P.DeductionLine(F(r'r \to (q \to r)'), P.Rule.parse(r'\to I 3-6')))
+
+    html = main.html()
+    assert html_rows(html) == [(1, 1, '$p$'), (2, 1, '$q$'), (3, 2, '$r$'), (4, 3, '$q$'), (5, 3, '$r$'), (6, 2, r'$(q \to r)$'), (7, 1, r'$(r \to (q \to r))$')]
+    # the last assumption of each proof is underlined
+    assert html.count('fitch-hline">') == 3
+    assert r'<span class="fitch-rule">$\to \! I\; 3\text{-}6$</span>' in html
+    # typeset by the KaTeX of Streamlit
+    assert 'http' not in html and '<script' not in html
+
+def test_html_of_predicate_proofs():
+    F = pred.proofs.Pred_Form.parse
+    main = pred.proofs.Proof([pred.proofs.NormalAssumptionLine(F(r'\forall x P(x)'))])
+    subproof = pred.proofs.Proof([pred.proofs.UnivIntroAssumptionLine('c_{1}')])
+    main.add_last(subproof)
+    subproof.add_last(pred.proofs.DeductionLine(F('P(c_1)'), pred.proofs.Rule.parse(r'\forall E 1')))
+    main.add_last(pred.proofs.DeductionLine(F(r'\forall x P(x)'), pred.proofs.Rule.parse(r'\forall I 2-3')))
+    subproof.add_last(pred.proofs.DeductionLine(pred.proofs.Blank(), pred.proofs.Blank()))
+    assert html_rows(main.html()) == [(1, 1, r'$\forall x P(x)$'), (2, 2, r'$\boxed{c_{1}}$'), (3, 2, '$P(c_{1})$'), (4, 2, ''), (5, 1, r'$\forall x P(x)$')]
+
+def window_numbers(latex):
+    numbers = latex.split(r'\begin{array}{l}' + '\n')[1].split(r'\end{array}')[0]
+    return [number.strip() for number in numbers.split(r'\\')[:-1]]
+
+def windowed_proof(n):
+    """
+    n lines, a closed subproof at lines n+2 to n+3, a line, and the open subproof current at n+5 to n+6
+    """
+    F = P.PropNode.parse
+    main = P.Proof([P.AssumptionLine(F('p'))])
+    for _ in range(n-1):
+        main.add_last(P.DeductionLine(F('p'), P.Rule.parse('R 1')))
+    closed = P.Proof([P.AssumptionLine(F('q'))])
+    main.add_last(closed)
+    closed.add_last(P.DeductionLine(F('q'), P.Rule.parse(f'R {n+1}')))
+    main.add_last(P.DeductionLine(F('p'), P.Rule.parse('R 1')))
+    current = P.Proof([P.AssumptionLine(F('r'))])
+    main.add_last(current)
+    current.add_last(P.DeductionLine(F('r'), P.Rule.parse(f'R {n+4}')))
+    return main, current
+
+def test_latex_window_bounds():
+    main, current = windowed_proof(4)
+    rows = ['1', '2', '3', '4', r'5\text{-}6', '7', '8', '9']
+    assert window_numbers(main.latex_window(current, 8)) == rows
+    assert window_numbers(main.latex_window(current, 40)) == rows
+    assert window_numbers(main.latex_window(current, 7)) == [r'\vdots'] + rows[1:]
+    assert window_numbers(main.latex_window(current, 1)) == [r'\vdots', '9']
+    # seen from the main proof, the current subproof is collapsed too
+    assert window_numbers(main.latex_window(main, 40)) == rows[:-2] + [r'8\text{-}9']
+    for size in [1, 5, 7, 40]:
+        latex = main.latex_window(current, size)
+        assert latex.count(r'\begin{array}') == latex.count(r'\end{array}')
+
+def test_latex_window_only_renders_the_window():
+    main, current = windowed_proof(500)
+    main._forget_all()
+    assert window_numbers(main.latex_window(current, 5)) == [r'\vdots', '500', r'501\text{-}502', '503', '504', '505']
+    # the five rows, the second line of the collapsed subproof and the row under \vdots
+    assert len(main._latex_lines) == 7
@@ -0,0 +1,58 @@
+import pytest
+import prop.rules
+import pred.rules
+from parse_cache import *
+
+def test_same_rule_on_both_pages():
+    text = r'\wedge E 1'
+    prop_rule, prop_err = cached_parse(Parser('prop', prop.rules.Rule.parse, prop.rules.RuleError), text)
+    pred_rule, pred_err = cached_parse(Parser('pred', pred.rules.Rule.parse, pred.rules.RuleError), text)
+    assert prop_err is None and pred_err is None
+    assert type(prop_rule) is prop.rules.Rule
+    assert type(pred_rule) is pred.rules.Rule
+
+def test_error_is_not_shared_between_pages():
+    text = r'\forall E 1'
+    _, prop_err = cached_parse(Parser('prop', prop.rules.Rule.parse, prop.rules.RuleError), text)
+    pred_rule, pred_err = cached_parse(Parser('pred', pred.rules.Rule.parse, pred.rules.RuleError), text)
+    assert isinstance(prop_err, prop.rules.RuleError)
+    assert pred_err is None and type(pred_rule) is pred.rules.Rule
+
+def test_parsers_of_a_rerun_share_entries():
+    def parser(string):
+        return string.split(',')
+    first = cached_parse(Parser('prop', parser, ValueError), 'p,q')
+    def parser(string):
+        return string.split(',')
+    assert cached_parse(Parser('prop', parser, ValueError), 'p,q')[0] is first[0]
+
+def test_error_class_is_part_of_the_key():
+    def parser(string):
+        return int(string)
+    _, err = cached_parse(Parser('prop', parser, ValueError), 'p')
+    assert isinstance(err, ValueError)
+    with pytest.raises(ValueError):
+        cached_parse(Parser('prop', parser, KeyError), 'p')
+
+def test_defined_rules_are_parsed_anew():
+    import prop.checkers
+    text = 'MT 1, 2'
+    _, err = cached_parse(Parser('prop', prop.rules.Rule.parse, prop.rules.RuleError), text)
+    assert isinstance(err, prop.rules.RuleError)
+    try:
+        prop.checkers.define_rule('MT', prop.checkers.derived_schemas['MT'])
+        rule, err = cached_parse(Parser('prop', prop.rules.Rule.parse, prop.rules.RuleError), text)
+        assert err is None and rule.name == 'MT'
+    finally:
+        prop.checkers.use_ruleset(prop.checkers.ruleset_name)
+    _, err = cached_parse(Parser('prop', prop.rules.Rule.parse, prop.rules.RuleError), text)
+    assert isinstance(err, prop.rules.RuleError)
+
+def test_errors_are_rebuilt_without_their_traceback():
+    parser = Parser('pred', pred.rules.Rule.parse, pred.rules.RuleError)
+    _, first = cached_parse(parser, 'XYZ 1')
+    _, second = cached_parse(parser, 'XYZ 1')
+    assert first is not second
+    assert type(first) is type(second) and str(first) == str(second) == "We couldn't parse this rule name."
+    assert first.__traceback__ is None
+    assert parse_entry(parser, 'XYZ 1')[1] == (pred.rules.RuleError, ("We couldn't parse this rule name.",))
@@ -0,0 +1,72 @@
+import random
+import prop.rules
+import pred.rules
+
+def scanned(string, rules):
+    """
+    Rule.parse as it was before the trie: the first rule name in the table that starts the string,
+    then the citation checked character by character.
+    Returns ('rule', name, cited lines), or the kind of error: 'name', 'citation' or 'twice'
+    """
+    string = string.replace(' ', '').replace(r'\land', r'\wedge').replace(r'\lor', r'\vee')
+    for name in rules:
+        if string.startswith(name.replace(' ', '')):
+            string = string[len(name.replace(' ', '')):]
+            break
+    else:
+        return 'name'
+    if string.startswith(','):
+        string = string[1:]
+    if rules[name] == '':
+        return ('rule', name, ()) if string == '' else 'citation'
+
+    if any(char not in '0123456789,-' for char in string):
+        return 'citation'
+    if ''.join(char for char in string if char in ',-') != rules[name].replace(' ', '').replace('%s', ''):
+        return 'citation'
+    if any(len(piece) == 0 for piece in string.replace('-', ',').split(',')):
+        return 'citation'
+    singles = [piece for piece in string.split(',') if '-' not in piece]
+    if len(set(singles)) != len(singles):
+        return 'twice'
+    return ('rule', name, tuple(string.replace('-', ',').split(',')))
+
+def parsed(string, R):
+    try:
+        rule = R.Rule.parse(string)
+    except R.CitationError as err:
+        return 'twice' if 'twice' in str(err) else 'citation'
+    except R.RuleError:
+        return 'name'
+    return ('rule', rule.name, tuple(rule.cit_lines))
+
+def random_rule(rng, rules):
+    name = rng.choice(list(rules) + ['Reit', r'\land I', r'\lor E', 'X'])
+    citation = rules.get(name, rng.choice(list(rules.values())))
+    name = ''.join(char + ' ' * rng.randint(0, 1) for char in name)
+    numbers = [str(rng.choice([1, 2, 3, 12, 40])) for _ in range(citation.count('%s'))]
+    citation = citation % tuple(numbers)
+    if rng.random() < 0.3:
+        i = rng.randint(0, len(citation))
+        citation = citation[:i] + rng.choice([',', '-', ' ', '', 'a', '1', ',,']) + citation[i+1:]
+    return f'{name}{rng.choice(["", " ", ","])}{citation}'
+
+def test_trie_parses_rules_as_the_scan_did():
+    rng = random.Random(14)
+    for R in [prop.rules, pred.rules]:
+        rules = R.rule_book.tables['standard']
+        R.use_rules('standard')
+        try:
+            for _ in range(3000):
+                string = random_rule(rng, rules)
+                assert parsed(string, R) == scanned(string, rules), string
+        finally:
+            R.use_rules(R.ruleset_name)
+
+def test_longest_rule_name_wins():
+    rules = dict(prop.rules.rule_book.tables['standard'], Reit='%s')
+    parser = prop.rules.RuleParser(rules)
+    assert parser.name('Reit1') == ('Reit', '1')
+    assert parser.name('R1') == ('R', '1')
+    assert parser.name(r'\veeE1') == (r'\vee E', '1')
+    assert parser.name('Q1') == (None, 'Q1')
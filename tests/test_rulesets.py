@@ -0,0 +1,38 @@
+import json
+import pytest
+import prop.rulesets
+import pred.rulesets
+
+def write(tmp_path, config):
+    path = tmp_path / 'rulesets.json'
+    path.write_text(json.dumps(config))
+    return str(path)
+
+def test_each_logic_has_its_own_rule_sets(tmp_path):
+    path = write(tmp_path, {'prop': {'default': 'derived', 'rulesets': {'derived': {'add': {'DN': r'cite \neg \neg A; conclude A'}}}},
+                            'pred': {'rulesets': {'plain': {}}}})
+    loaded, default = prop.rulesets.load_rulesets(path, 'prop')
+    assert default == 'derived' and set(loaded['derived'].add) == {'DN'}
+    loaded, default = pred.rulesets.load_rulesets(path, 'pred')
+    assert default == 'plain' and loaded['plain'].add == {}
+
+def test_missing_logic_gets_the_standard_rules(tmp_path):
+    path = write(tmp_path, {'prop': {'rulesets': {'without EFQ': {'drop': ['EFQ']}}}})
+    loaded, default = pred.rulesets.load_rulesets(path, 'pred')
+    assert default == 'standard' and list(loaded) == ['standard']
+
+def test_unknown_entry_is_an_error(tmp_path):
+    path = write(tmp_path, {'default': 'standard', 'rulesets': {'standard': {}}})
+    with pytest.raises(prop.rulesets.RulesetError):
+        prop.rulesets.load_rulesets(path, 'prop')
+
+def test_shipped_rule_sets():
+    assert 'with derived rules' in prop.rulesets.rulesets
+    assert 'with derived rules' not in pred.rulesets.rulesets
+
+def test_pred_shares_the_rulebook_but_keeps_its_names():
+    import prop.schemas, pred.schemas, pred.formula, pred.rules
+    assert pred.schemas.Schema is prop.schemas.Schema
+    assert pred.rules.ParsingError is pred.formula.ParsingError
+    assert pred.rules.aliases is pred.formula.aliases
+    assert r'\forall E' in pred.rules.rule_book.parsers['standard'].citations
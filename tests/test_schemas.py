@@ -0,0 +1,88 @@
+import random
+import re
+import pytest
+import rulebook
+import prop.checkers
+import pred.checkers
+import prop.proofs
+import pred.proofs
+
+def matches(text, cited, main):
+    F = prop.proofs.PropNode.parse
+    return rulebook.Schema(text).match(F(main), [F(cited)], [])
+
+def test_patterns_with_several_connectives():
+    assert matches(r'cite A \wedge B \to C; conclude C', r'p \wedge q \to r', 'r')
+    assert matches(r'cite A \wedge B \to C; conclude C', r'p \wedge (q \to r)', 'r')
+    assert not matches(r'cite A \wedge B \to C; conclude C', r'(p \wedge q) \to r', 'r')
+    assert matches(r'cite (A \wedge B) \to C; conclude C', r'(p \wedge q) \to r', 'r')
+    assert matches(r'cite \neg A \vee B \leftrightarrow C; conclude A', r'\neg p \vee (q \leftrightarrow r)', 'p')
+    assert matches(r'cite A \to B \to C; conclude A', r'p \to (q \to r)', 'p')
+    assert not matches(r'cite A \to B \to C; conclude A', r'(p \to q) \to r', 'p')
+
+def test_unbalanced_patterns():
+    for text in [r'cite (A \wedge B; conclude A', r'cite A \wedge B); conclude A', r'cite A \wedge; conclude A']:
+        with pytest.raises(rulebook.SchemaError):
+            rulebook.Schema(text)
+
+def test_both_logics_use_the_shared_rulebook():
+    assert prop.checkers.Schema is rulebook.Schema
+    assert pred.checkers.Schema is rulebook.Schema
+    assert prop.checkers.RulesetError is rulebook.RulesetError
+
+# the formulas that stand for the letters of the schemas
+pools = [
+    (prop.proofs, prop.checkers, prop.proofs.PropNode.parse, prop.proofs.AssumptionLine,
+     ['p', 'q', r'\bot', r'\neg p', r'\neg q', r'\neg \neg p', r'p \wedge q', r'q \wedge p', r'p \wedge \neg p', r'\neg p \wedge p',
+      r'p \vee q', r'p \to q', r'q \to p', r'\neg p \to q', r'p \leftrightarrow q', r'q \leftrightarrow p']),
+    (pred.proofs, pred.checkers, pred.proofs.Pred_Form.parse, pred.proofs.NormalAssumptionLine,
+     ['P(c)', 'Q(c)', r'\bot', r'\neg P(c)', r'\neg Q(c)', r'\neg \neg P(c)', r'P(c) \wedge Q(c)', r'P(c) \wedge \neg P(c)',
+      r'\neg P(c) \wedge P(c)', r'P(c) \vee Q(c)', r'P(c) \to Q(c)', r'\neg P(c) \to Q(c)', r'P(c) \leftrightarrow Q(c)',
+      r'\forall x P(x)', r'\forall y P(y)', r'\forall x P(x) \to Q(c)']),
+]
+
+def subproof(P, assumption, first, last):
+    proof = P.Proof([assumption(first)])
+    if last is not first:
+        proof.add_last(P.DeductionLine(last, P.Rule.parse('R 1')))
+    return proof
+
+def instances(P, parse, assumption, text, texts, rng):
+    """
+    Fills the capital letters of each alternative of the schema text with formulas, mostly the same one for each letter,
+    and yields the deduced formula, the cited formulas and the cited subproofs
+    """
+    for alternative in text.split('|'):
+        cited, conclusion = alternative.split(';')
+        bindings = {}
+        def fill(pattern):
+            def formula(letter):
+                if letter.group() not in bindings or rng.random() < 0.1:
+                    bindings[letter.group()] = rng.choice(texts)
+                return f'({bindings[letter.group()]})'
+            return parse(re.sub('[A-Z]', formula, pattern.strip()))
+        cit_formulas, cit_subproofs = [], []
+        for citation in cited.split(','):
+            citation = citation.strip()[len('cite'):]
+            if '[' in citation:
+                first, last = citation.strip(' []').split('...')
+                cit_subproofs.append(subproof(P, assumption, fill(first), fill(last)))
+            else:
+                cit_formulas.append(fill(citation))
+        yield fill(conclusion.strip()[len('conclude'):]), cit_formulas, cit_subproofs
+
+def test_schema_matches_are_accepted_by_the_checks():
+    # a rule with both a schema and a check accepts what the schema matches without checking,
+    # so the schema must not be looser than the check
+    rng = random.Random(0)
+    for (P, checkers, parse, assumption, texts) in pools:
+        for (name, checker) in checkers.builtin_checkers.items():
+            if checker.schema is None or checker.check is None:
+                continue
+            matched = 0
+            for _ in range(200):
+                for (main_formula, cit_formulas, cit_subproofs) in instances(P, parse, assumption, checker.schema.text, texts, rng):
+                    if checker.schema.match(main_formula, cit_formulas, cit_subproofs):
+                        matched += 1
+                        assert isinstance(checker.check(main_formula, cit_formulas, cit_subproofs), P.GoodComment), (name, main_formula, cit_formulas)
+            assert matched > 0, name
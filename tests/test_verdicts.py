@@ -0,0 +1,199 @@
+import prop.proofs
+import pred.proofs
+
+packages = [(prop.proofs, prop.proofs.PropNode.parse('p'), prop.proofs.AssumptionLine),
+            (pred.proofs, pred.proofs.Pred_Form.parse('P(c)'), pred.proofs.NormalAssumptionLine)]
+
+def test_forward_citation_is_renumbered():
+    for (P, formula, assumption) in packages:
+        main = P.Proof([assumption(formula)])
+        main.add_last(P.DeductionLine(formula, P.Rule.parse('R 4')))
+        main.add_last(P.DeductionLine(formula, P.Rule.parse('R 1')))
+        main.add_last(P.DeductionLine(formula, P.Rule.parse('R 1')))
+        assert main.check_all()[1].text == 'Line 4 is not accessible at this line.'
+
+        main.add_line(2, formula, P.Rule.parse('R 1'))
+        assert main.check_all()[1].text == 'Line 5 is not accessible at this line.'
+
+        main.delete_line(3)
+        assert main.check_all()[1].text == 'Line 4 is not accessible at this line.'
+
+def test_citation_of_a_missing_line_keeps_its_number():
+    for (P, formula, assumption) in packages:
+        main = P.Proof([assumption(formula)])
+        # there is no line 3 yet, so this cites the number 3 rather than a line
+        main.add_last(P.DeductionLine(formula, P.Rule.parse('R 3')))
+        main.add_line(1, formula, P.Rule.parse('R 1'))
+        main.add_line(1, formula, P.Rule.parse('R 1'))
+        assert isinstance(main.check_all()[3], P.GoodComment)
+
+        main.delete_line(2)
+        assert main.check_all()[2].text == main.check_line(3).text
+        assert isinstance(main.check_all()[2], P.BadComment)
+
+# the formula parser and the atoms p, q and r of each logic
+parse = {prop.proofs: prop.proofs.PropNode.parse, pred.proofs: pred.proofs.Pred_Form.parse}
+atoms = {prop.proofs: {'p': 'p', 'q': 'q', 'r': 'r'},
+         pred.proofs: {'p': 'P(c)', 'q': 'Q(c)', 'r': 'R(c)'}}
+
+def nested_proof(P, assumption):
+    """
+    1  p
+    2  q
+    3  | r
+    4  | p and r                  and I 1, 3
+    5  | | q
+    6  | | p and r                R 4
+    7  | q to (p and r)           to I 5-6
+    8  r to (q to (p and r))      to I 3-7
+    9  p and q                    and I 1, 2
+    Returns the main proof and the two subproofs.
+    """
+    F = lambda string: parse[P](string.format(**atoms[P]))
+    main = P.Proof([assumption(F('{p}')), assumption(F('{q}'))])
+    outer = P.Proof([assumption(F('{r}'))])
+    main.add_last(outer)
+    outer.add_last(P.DeductionLine(F(r'{p} \wedge {r}'), P.Rule.parse(r'\wedge I 1, 3')))
+    inner = P.Proof([assumption(F('{q}'))])
+    outer.add_last(inner)
+    inner.add_last(P.DeductionLine(F(r'{p} \wedge {r}'), P.Rule.parse('R 4')))
+    outer.add_last(P.DeductionLine(F(r'{q} \to ({p} \wedge {r})'), P.Rule.parse(r'\to I 5-6')))
+    main.add_last(P.DeductionLine(F(r'{r} \to ({q} \to ({p} \wedge {r}))'), P.Rule.parse(r'\to I 3-7')))
+    main.add_last(P.DeductionLine(F(r'{p} \wedge {q}'), P.Rule.parse(r'\wedge I 1, 2')))
+    return main, outer, inner
+
+def recheck(main):
+    """
+    Runs check_all and returns the numbers of the lines it checked again, after comparing
+    every verdict with a fresh check_line
+    """
+    checked = []
+    check = main._check_deduction
+    def recording(n, line, is_open):
+        checked.append(n)
+        return check(n, line, is_open)
+    main._check_deduction = recording
+    try:
+        comments = main.check_all()
+    finally:
+        del main._check_deduction
+    assert [comment.text for comment in comments] == [main.check_line(n).text for n in range(1, main.n_lines()+1)]
+    return checked
+
+def test_nested_proof_checks():
+    for (P, formula, assumption) in packages:
+        main, outer, inner = nested_proof(P, assumption)
+        assert recheck(main) == [4, 6, 7, 8, 9]
+        assert all(isinstance(comment, P.GoodComment) for comment in main.check_all())
+        assert recheck(main) == []
+
+def test_insert_rechecks_the_line_and_the_citations_of_its_subproof():
+    for (P, formula, assumption) in packages:
+        main, outer, inner = nested_proof(P, assumption)
+        recheck(main)
+        main.add_line(4, parse[P](atoms[P]['r']), P.Rule.parse(r'\wedge E 4'))
+        # line 9 cites the subproof the new line 5 went into; the shifted lines cite the same lines as before
+        assert recheck(main) == [5, 9]
+        assert main.rule_of(main.find(7)).cit_lines == ('4',)
+
+        main.add_line(6, parse[P](atoms[P]['p']), P.Rule.parse(r'\wedge E 7'))
+        assert recheck(main) == [7, 9, 10]
+        assert isinstance(main.check_all()[6], P.BadComment)
+
+def test_change_rechecks_the_lines_citing_it():
+    for (P, formula, assumption) in packages:
+        main, outer, inner = nested_proof(P, assumption)
+        recheck(main)
+        main.change(4, parse[P](atoms[P]['q']), P.Rule.parse('R 2'))
+        assert recheck(main) == [4, 6, 8]
+        assert isinstance(main.check_all()[5], P.BadComment)
+
+def test_delete_rechecks_the_lines_citing_the_deleted_ones():
+    for (P, formula, assumption) in packages:
+        main, outer, inner = nested_proof(P, assumption)
+        recheck(main)
+        # deletes the inner subproof, lines 5-6; line 7 cited it and now cites whatever has its numbers
+        main.delete_line(5)
+        assert recheck(main) == [5, 6]
+        assert main.check_all()[4].text == 'The range 5-5 does not come strictly before the line on which it is cited.'
+
+        main.delete_line(4)
+        assert recheck(main) == [4, 5]
+
+def test_self_delete_rechecks_the_lines_citing_the_subproof():
+    for (P, formula, assumption) in packages:
+        main, outer, inner = nested_proof(P, assumption)
+        recheck(main)
+        inner.self_delete()
+        assert recheck(main) == [5, 6]
+        assert main.rule_of(main.find(7)).cit_lines == ('1', '2')
+
+        # line 3 cited the outer subproof, line 4 cites lines 1 and 2, which stay
+        outer.self_delete()
+        assert recheck(main) == [3]
+        assert main.n_lines() == 4
+
+def test_remove_last_and_add_last_recheck_only_the_end():
+    for (P, formula, assumption) in packages:
+        main, outer, inner = nested_proof(P, assumption)
+        recheck(main)
+        main.remove_last()
+        assert recheck(main) == []
+        main.add_last(P.DeductionLine(parse[P](atoms[P]['q']), P.Rule.parse('R 9')))
+        assert recheck(main) == [9]
+        assert isinstance(main.check_all()[8], P.BadComment)
+
+def test_forall_intro_is_rechecked_every_time():
+    F = pred.proofs.Pred_Form.parse
+    const_name = pred.proofs.Pred_Term.parse('c_1').value
+    main = pred.proofs.Proof([pred.proofs.NormalAssumptionLine(F(r'\forall x P(x)'))])
+    subproof = pred.proofs.Proof([pred.proofs.UnivIntroAssumptionLine(const_name)])
+    main.add_last(subproof)
+    subproof.add_last(pred.proofs.DeductionLine(F('P(c_1)'), pred.proofs.Rule.parse(r'\forall E 1')))
+    main.add_last(pred.proofs.DeductionLine(F(r'\forall x P(x)'), pred.proofs.Rule.parse(r'\forall I 2-3')))
+    assert recheck(main) == [3, 4]
+    assert isinstance(main.check_all()[3], pred.proofs.GoodComment)
+    assert recheck(main) == [4]
+
+    # the constant now appears outside the subproof, on a line that line 4 does not cite
+    main.add_last(pred.proofs.DeductionLine(F('P(c_1)'), pred.proofs.Rule.parse(r'\forall E 1')))
+    assert recheck(main) == [4, 5]
+    assert main.check_all()[3].text == 'The cited subproof begins with a constant that appears elsewhere in the proof.'
+
+    main.delete_line(5)
+    assert recheck(main) == [4]
+    assert isinstance(main.check_all()[3], pred.proofs.GoodComment)
+
+def citations(P, main):
+    return [main.rule_of(line).cit if isinstance(line, P.DeductionLine) else '' for line in main.index()[0]]
+
+def test_citations_follow_the_lines_they_cite():
+    for (P, formula, assumption) in packages:
+        main = P.Proof([assumption(formula)])
+        for text in ['R 1', 'R 2', 'R 3', 'R 1', 'R 9']:
+            main.add_last(P.DeductionLine(formula, P.Rule.parse(text)))
+        # a citation of the deleted line goes to the line that takes its number; a number past the end stays
+        main.delete_line(2)
+        assert citations(P, main) == ['', '2', '2', '1', '9']
+        main.delete_line(4)
+        assert citations(P, main) == ['', '2', '2', '9']
+        main.add_line(1, formula, P.Rule.parse('R 1'))
+        assert citations(P, main) == ['', '1', '3', '3', '9']
+
+def test_citations_of_a_deleted_subproof():
+    for (P, formula, assumption) in packages:
+        main, outer, inner = nested_proof(P, assumption)
+        main.delete_line(5)
+        assert citations(P, main) == ['', '', '', '1, 3', '5-5', '3-5', '1, 2']
+        assert main.check_all()[4].text == main.check_line(5).text
+
+        main, outer, inner = nested_proof(P, assumption)
+        inner.self_delete()
+        assert citations(P, main) == ['', '', '', '1, 3', '5-5', '3-5', '1, 2']
+
+        # the ends of a range in the deleted subproof go to the line that takes their numbers, here the citing line itself
+        main, outer, inner = nested_proof(P, assumption)
+        main.delete_line(3)
+        assert citations(P, main) == ['', '', '3-3', '1, 2']
+        main.delete_line(3)
+        assert citations(P, main) == ['', '', '1, 2']